@@ -1,11 +1,24 @@
-from flask import Flask, request, jsonify
-import bcrypt
+from flask import Flask, Response, g, request, jsonify
+from functools import wraps
+import atexit
+import json
 from flask_cors import CORS
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import os
+import threading
+import uuid
 from dotenv import load_dotenv
 from supabase import create_client
 from reporting import reporting
+from matching import (VolunteerSkillIndex, EventSkillIndex, MatchCache, canonical_skills, event_key,
+                      parse_event_date, skill_vocabulary)
+from bulk_matching import ParallelMatcher
+from notifications import (NotificationCompactor, NotificationHub, NotificationStore, SupabaseNotificationBackend,
+                           decode_cursor, encode_cursor, parse_notification_id, position)
+from passwords import PasswordHasherBusy, hash_password, password_hasher, rehash_in_background, verify_password
+from tokens import InvalidToken, TokenSigner, default_secret
+from users import UserCache
+from reminders import EventCalendar, ReminderScheduler, SupabaseReminderLog
 
 
 # Load environment variables
@@ -20,19 +33,102 @@ supabase = create_client(
     os.getenv('SUPABASE_KEY')
 )
 
+# Process-local mirror of the volunteer pool and events
+db = {
+    'users': [],
+    'events': []
+}
+
+# Signed access/refresh tokens issued by /login
+token_signer = TokenSigner(
+    default_secret(),
+    access_ttl=int(os.getenv('ACCESS_TOKEN_TTL', 900)),
+    refresh_ttl=int(os.getenv('REFRESH_TOKEN_TTL', 14 * 24 * 3600))
+)
+
+# New notifications pushed to /notifications/<username>/stream subscribers
+notification_hub = NotificationHub()
+
+# Notifications persisted to the notifications table in buffered batches
+# Repeats of a (username, type, related_id) within the window are dropped
+notification_store = NotificationStore(
+    SupabaseNotificationBackend(supabase),
+    hub=notification_hub,
+    dedupe_window=float(os.getenv('NOTIFICATION_DEDUPE_WINDOW', 86400)),
+    cache_ttl=float(os.getenv('NOTIFICATION_CACHE_TTL', 30))
+)
+# Write what is still buffered when the process exits
+atexit.register(notification_store.close)
+
+# Retention: notifications expire after 90 days (read ones after 30), at most 500 kept per user
+notification_compactor = NotificationCompactor(
+    notification_store,
+    max_age=timedelta(days=float(os.getenv('NOTIFICATION_MAX_AGE_DAYS', 90))),
+    read_max_age=timedelta(days=float(os.getenv('NOTIFICATION_READ_MAX_AGE_DAYS', 30))),
+    max_per_user=int(os.getenv('NOTIFICATION_MAX_PER_USER', 500))
+)
+
+# Skill -> volunteer inverted index used by find_best_matches
+volunteer_index = VolunteerSkillIndex()
+
+# Skill -> upcoming event index used by get_volunteer_matches
+event_index = EventSkillIndex()
+
+# Upcoming events in date order, used by the reminder sweep
+event_calendar = EventCalendar()
+
+# Match results by event and by volunteer, invalidated by profile and event writes
+match_cache = MatchCache()
+
+# Bulk matcher over the volunteer pool (process pool for large pools), rebuilt lazily after pool changes
+bulk_matcher = None
+bulk_matcher_lock = threading.Lock()
+
+# Postgres SQLSTATE for a unique constraint violation
+UNIQUE_VIOLATION = '23505'
+
 # Validation schemas
 USER_SCHEMA = {
     'username': {'required': True, 'type': str, 'min_length': 3, 'max_length': 30},
     'password': {'required': True, 'type': str, 'min_length': 6},
     'email': {'required': True, 'type': str, 'max_length': 50},
-    'skills': {'type': list},
+    'skills': {'type': list, 'item_type': str},
+    'preferences': {'type': str}
+}
+
+PROFILE_SCHEMA = {
+    'email': {'type': str, 'max_length': 50},
+    'skills': {'type': list, 'item_type': str},
     'preferences': {'type': str}
 }
 
+MATCH_BATCH_SCHEMA = {
+    'event_names': {'type': list, 'item_type': str},
+    'event_ids': {'type': list, 'item_type': str}
+}
+
+# Where find_best_matches scores volunteers: 'python' (in-process skill index)
+# or 'database' (the match_volunteers function in database/schema.sql)
+MATCH_BACKEND = os.getenv('MATCH_BACKEND', 'python')
+
+# Where check_upcoming_events finds events: 'python' (event_calendar) or
+# 'database' (an eventDate range query served by idx_events_eventDate)
+REMINDER_BACKEND = os.getenv('REMINDER_BACKEND', 'python')
+
+# Page sizes for GET /notifications/<username>
+DEFAULT_NOTIFICATION_PAGE = 50
+MAX_NOTIFICATION_PAGE = 200
+
+# Seconds between keep-alive comments on idle notification streams
+STREAM_KEEPALIVE = 15
+
+# Largest number of events accepted by POST /matches/events
+MAX_BATCH_EVENTS = 100
+
 EVENT_SCHEMA = {
     'eventName': {'required': True, 'type': str, 'min_length': 5},
     'location': {'required': True, 'type': str},
-    'requiredSkills': {'required': True, 'type': list, 'min_length': 1},
+    'requiredSkills': {'required': True, 'type': list, 'item_type': str, 'min_length': 1},
     'urgency': {'required': True, 'type': str, 'values': ['low', 'medium', 'high']},
     'eventDate': {'required': True, 'type': str}
 }
@@ -52,14 +148,36 @@ def validate_data(data, schema):
             errors.append(f'{field} must be at least {rules["min_length"]} characters.')
         if 'max_length' in rules and len(value) > rules['max_length']:
             errors.append(f'{field} must not exceed {rules["max_length"]} characters.')
+        if 'item_type' in rules and isinstance(value, list) and not all(isinstance(item, rules['item_type']) for item in value):
+            errors.append(f'{field} must only contain items of type {rules["item_type"]}.')
         if 'values' in rules and value not in rules['values']:
             errors.append(f'{field} must be one of: {", ".join(rules["values"])}')
     return errors
 
-def get_user(username):
+def fetch_user(username):
     response = supabase.table('users').select('*').eq('username', username).execute()
     return response.data[0] if response.data else None
 
+# User rows by username; writes below invalidate or refresh their entry
+user_cache = UserCache(
+    fetch_user,
+    max_entries=int(os.getenv('USER_CACHE_SIZE', 10000)),
+    ttl=float(os.getenv('USER_CACHE_TTL', 60)),
+    negative_ttl=float(os.getenv('USER_CACHE_NEGATIVE_TTL', 5))
+)
+
+def get_user(username):
+    return user_cache.get(username)
+
+def is_unique_violation(error):
+    """Whether a Supabase error is Postgres rejecting a duplicate key."""
+    return getattr(error, 'code', None) == UNIQUE_VIOLATION
+
+def save_password_hash(username, hashed_password):
+    """Store a rehashed password for an existing user."""
+    supabase.table('users').update({'password': hashed_password}).eq('username', username).execute()
+    user_cache.invalidate(username)
+
 def create_response(data=None, message=None, error=None, status=200):
     response = {}
     if data is not None:
@@ -70,14 +188,46 @@ def create_response(data=None, message=None, error=None, status=200):
         response['error'] = error
     return jsonify(response), status
 
+def busy_response():
+    """503 for requests turned away because password hashing is saturated."""
+    response, status = create_response(error='Server is busy, please retry shortly', status=503)
+    return response, status, {'Retry-After': '1'}
+
+def bearer_token():
+    """Return the token from an ``Authorization: Bearer`` header, if any."""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return token.strip() if scheme.lower() == 'bearer' and token.strip() else None
+
+def require_auth(view):
+    """Require a valid access token; the caller's username is set on ``g.username``.
+
+    Tokens are checked locally against the signing secret and the denylist,
+    without Supabase or bcrypt. Routes with a ``username`` argument only
+    accept a token for that user.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = bearer_token()
+        if token is None:
+            return create_response(error='Authentication required', status=401)
+        try:
+            g.token = token_signer.verify(token)
+        except InvalidToken as e:
+            return create_response(error=str(e), status=401)
+        g.username = g.token['sub']
+        if 'username' in kwargs and kwargs['username'] != g.username:
+            return create_response(error='Forbidden', status=403)
+        return view(*args, **kwargs)
+    return wrapper
+
 def calculate_match_score(volunteer_skills, event_required_skills):
     """Calculate match score between volunteer and event."""
     if not volunteer_skills or not event_required_skills:
         return 0
     
-    # Normalize skills to lowercase for case-insensitive comparison
-    volunteer_skills = {skill.lower() for skill in volunteer_skills}
-    event_required_skills = {skill.lower() for skill in event_required_skills}
+    # Compare interned skill IDs so case and whitespace differences are ignored
+    volunteer_skills = skill_vocabulary.ids(volunteer_skills)
+    event_required_skills = skill_vocabulary.ids(event_required_skills)
 
     matching_skills = volunteer_skills & event_required_skills
     total_required_skills = len(event_required_skills)
@@ -86,75 +236,214 @@ def calculate_match_score(volunteer_skills, event_required_skills):
 
 
 
-def find_best_matches(event, max_matches=5):
+def find_best_matches(event, max_matches=5, threshold=50):
     """Find the best volunteer matches for an event."""
-    event_scores = []
-    
-    print("Finding matches for event:", event)  # Log event details
-    
-    for user in db['users']:
-        if 'skills' not in user:
-            continue
-        
-        # Log each user’s skills to debug matching
-        print("Checking user:", user['username'], "with skills:", user['skills'])
-        print("Event required skills:", event['requiredSkills'])
-        
-        score = calculate_match_score(user['skills'], event['requiredSkills'])
-        print("Calculated match score:", score)  # Debug score calculation
-        
-        if score > 50:  # Only consider matches above 50% compatibility
-            event_scores.append({
-                'username': user['username'],
-                'score': score,
-                'email': user['email']
-            })
-    
-    return sorted(event_scores, key=lambda x: x['score'], reverse=True)[:max_matches]
-
-
-
+    if MATCH_BACKEND == 'database':
+        return find_best_matches_in_database(event, max_matches, threshold)
+
+    # Only volunteers sharing at least one required skill are scored
+    return volunteer_index.match(event['requiredSkills'], threshold=threshold, max_matches=max_matches)
+
+def find_best_matches_in_database(event, max_matches=5, threshold=50):
+    """Score volunteers in Postgres through the match_volunteers RPC."""
+    response = supabase.rpc('match_volunteers', {
+        'required_skills': event['requiredSkills'],
+        'match_threshold': threshold,
+        'max_matches': max_matches
+    }).execute()
+    return [
+        {'username': row['username'], 'score': row['score'], 'email': row['email']}
+        for row in response.data or []
+    ]
+
+def parse_match_params(args):
+    """Read the threshold and limit query parameters for match routes."""
+    errors = []
+    try:
+        threshold = float(args.get('threshold', 50))
+    except (TypeError, ValueError):
+        threshold = None
+    try:
+        max_matches = int(args.get('limit', 5))
+    except (TypeError, ValueError):
+        max_matches = None
+    if threshold is None or not 0 <= threshold <= 100:
+        errors.append('threshold must be a number between 0 and 100.')
+    if max_matches is None or max_matches < 1:
+        errors.append('limit must be a positive integer.')
+    return threshold, max_matches, errors
+
+def rebuild_volunteer_index():
+    """Rebuild the skill index from the volunteer pool in db['users']."""
+    volunteer_index.build(db['users'])
+    match_cache.clear()
+    reset_bulk_matcher()
+
+def upsert_volunteer(user):
+    """Add or update a volunteer in the local pool and the skill index."""
+    for i, existing in enumerate(db['users']):
+        if existing['username'] == user['username']:
+            db['users'][i] = {**existing, **user}
+            break
+    else:
+        db['users'].append(user)
+    volunteer_index.add(user)
+    match_cache.invalidate_volunteer(user)
+    reset_bulk_matcher()
+
+def fetch_all(query, page_size=1000):
+    """Fetch every row of ``query()`` a page at a time.
+
+    PostgREST caps a response at its max-rows setting (1000 by default), so
+    pages are requested with ``range`` until a short one comes back.
+    ``query`` builds a fresh, ordered query for each page.
+    """
+    rows = []
+    while True:
+        page = query().range(len(rows), len(rows) + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+
+def load_volunteer_pool():
+    """Load volunteers from Supabase and build the skill index."""
+    db['users'] = fetch_all(lambda: supabase.table('users').select('username, email, skills').order('username'))
+    rebuild_volunteer_index()
+
+def reset_bulk_matcher():
+    """Drop the bulk matcher (and its worker processes) after the pool changes."""
+    global bulk_matcher
+    with bulk_matcher_lock:
+        matcher, bulk_matcher = bulk_matcher, None
+    if matcher is not None:
+        matcher.close()
+
+atexit.register(reset_bulk_matcher)
+
+def match_all_events(events=None, threshold=50, max_matches=5):
+    """Match every upcoming event (or the given events) in one bulk pass."""
+    global bulk_matcher
+    with bulk_matcher_lock:
+        if bulk_matcher is None:
+            bulk_matcher = ParallelMatcher(db['users'])
+        matcher = bulk_matcher
+        # A reset while this match runs leaves the workers to the last caller to release them
+        matcher.retain()
+    try:
+        if events is None:
+            events = event_index.events()
+        matches = matcher.match_events(events, threshold=threshold, max_matches=max_matches)
+    finally:
+        matcher.release()
+    return [{'event': event, 'matches': event_matches} for event, event_matches in zip(events, matches)]
+
+def postgrest_list(values):
+    """Quote values for a PostgREST ``in.(...)`` filter."""
+    return ','.join('"{}"'.format(str(value).replace('\\', '\\\\').replace('"', '\\"')) for value in values)
+
+def fetch_events(event_names=(), event_ids=()):
+    """Fetch events by name and/or ID in a single query."""
+    query = supabase.table('events').select('*')
+    if event_names and event_ids:
+        query = query.or_(f'eventName.in.({postgrest_list(event_names)}),id.in.({postgrest_list(event_ids)})')
+    elif event_names:
+        query = query.in_('eventName', list(event_names))
+    else:
+        query = query.in_('id', list(event_ids))
+    return query.execute().data or []
+
+def rebuild_event_index():
+    """Rebuild the skill index and calendar from the upcoming events in db['events']."""
+    event_index.build(db['events'])
+    event_calendar.build(db['events'])
+    reminder_scheduler.build(db['events'])
+    match_cache.clear()
+
+def upsert_event(event):
+    """Add or update an event in the local catalog and the skill index."""
+    key = event_key(event)
+    for i, existing in enumerate(db['events']):
+        if event_key(existing) == key:
+            db['events'][i] = event
+            break
+    else:
+        db['events'].append(event)
+    event_index.add(event)
+    event_calendar.add(event)
+    reminder_scheduler.schedule(event)
+    match_cache.invalidate_event(event)
+
+def load_event_catalog():
+    """Load upcoming events from Supabase and build the skill index."""
+    today = datetime.now().date().isoformat()
+    db['events'] = fetch_all(lambda: supabase.table('events').select('*').gte('eventDate', today).order('id'))
+    rebuild_event_index()
 
 
 # Notification System Functions
 def create_notification(username, message, notification_type, related_id=None):
-    """Create a new notification for a user."""
-    if username not in db['notifications']:
-        db['notifications'][username] = []
-        
-    notification = {
-        'id': len(db['notifications'][username]) + 1,
-        'message': message,
-        'type': notification_type,
-        'timestamp': datetime.now().isoformat(),
-        'read': False,
-        'related_id': related_id
-    }
-    
-    db['notifications'][username].append(notification)
-    return notification
+    """Create a new notification for a user; returns None if it repeats a recent one."""
+    return notification_store.create(username, message, notification_type, related_id)
+
+def fetch_events_between(start, end):
+    """Query the events dated within [start, end] from Supabase."""
+    response = (
+        supabase.table('events').select('*')
+        .gte('eventDate', start.date().isoformat())
+        .lte('eventDate', end.date().isoformat())
+        .execute()
+    )
+    # eventDate is a date column; trim the day-granular result to the exact window
+    events = []
+    for event in response.data or []:
+        event_date = parse_event_date(event.get('eventDate'))
+        if event_date is not None and start <= event_date <= end:
+            events.append(event)
+    return events
+
+def upcoming_events(start, end):
+    """Return the events dated within [start, end]."""
+    if REMINDER_BACKEND == 'database':
+        return fetch_events_between(start, end)
+    return event_calendar.between(start, end)
+
+def create_notifications(usernames, template, notification_type, related_id=None, context=None):
+    """Send a notification rendered from ``template`` to each user in bulk."""
+    return notification_store.create_many(usernames, template, notification_type, related_id, context)
+
+def summarize_reminders(entries):
+    """Coalesce one user's reminders for several events into a single notification."""
+    names = [entry['related_id'] for entry in entries]
+    return f"Reminder: {len(names)} events tomorrow: {', '.join(names)}", None
+
+def send_event_reminders(events):
+    """Remind the best-matching volunteers that events are coming up.
+
+    A volunteer matched to several of the events gets one combined reminder.
+    """
+    entries = [
+        {
+            'username': match['username'],
+            'message': f"Reminder: {event['eventName']} is tomorrow!",
+            'type': 'event_reminder',
+            'related_id': event['eventName']
+        }
+        for event in events
+        for match in find_best_matches(event)
+    ]
+    notification_store.create_batch(entries, coalesce=summarize_reminders)
+    # Reminders are stored before the scheduler records the events as sent
+    notification_store.flush(force=True)
 
 def check_upcoming_events(test_mode=False):
     current_time = datetime.now()
-    print("Checking events:", db['events'])  # Add this line for debugging
-    for event in db['events']:
-        try:
-            event_date = datetime.strptime(event['eventDate'], '%Y-%m-%d')
-            if current_time + timedelta(days=1) >= event_date >= current_time:
-                # Find and notify matching volunteers
-                matches = find_best_matches(event)
-                for match in matches:
-                    create_notification(
-                        match['username'],
-                        f"Reminder: {event['eventName']} is tomorrow!",
-                        'event_reminder',
-                        event['eventName']
-                    )
-        except ValueError:
-            continue  # Skip events with invalid dates
+    send_event_reminders(upcoming_events(current_time, current_time + timedelta(days=1)))
     if test_mode:
         return  # Ensure this returns when called in test mode
 
+# Sends each event's reminder once, a day ahead; progress is kept in sentReminders
+reminder_scheduler = ReminderScheduler(send_event_reminders, log=SupabaseReminderLog(supabase))
+
 
 # Routes
 @app.route('/register', methods=['POST'])
@@ -165,25 +454,32 @@ def register():
         if errors:
             return create_response(error=errors, status=400)
 
-        if get_user(data['username']):
-            return create_response(error='User already exists', status=400)
-
         user_info = {
             'username': data['username'],
-            'password': bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8'),
+            'password': hash_password(data['password']),
             'email': data['email'],
-            'skills': data.get('skills', []),
+            'skills': canonical_skills(data.get('skills', [])),
             'preferences': data.get('preferences', ''),
             'created_at': datetime.now(timezone.utc).isoformat()
         }
-        supabase.table('users').insert(user_info).execute()
+        # One round trip: the users.username unique constraint rejects duplicates
+        try:
+            supabase.table('users').insert(user_info).execute()
+        except Exception as e:
+            if is_unique_violation(e):
+                return create_response(error='User already exists', status=400)
+            raise
+        user_cache.invalidate(data['username'])
 
         response_data = {k: v for k, v in user_info.items() if k != 'password'}
+        upsert_volunteer(response_data)
         return create_response(
             data={'user': response_data},
             message='User registered successfully',
             status=201
         )
+    except PasswordHasherBusy:
+        return busy_response()
     except Exception as e:
         return create_response(error=str(e), status=500)
 
@@ -195,9 +491,88 @@ def login():
             return create_response(error='Username and password are required', status=400)
 
         user = get_user(data['username'])
-        if user and bcrypt.checkpw(data['password'].encode('utf-8'), user['password'].encode('utf-8')):
-            return create_response(message='Login successful')
+        if user and verify_password(data['password'], user['password']):
+            rehash_in_background(
+                data['password'], user['password'],
+                lambda hashed: save_password_hash(user['username'], hashed)
+            )
+            return create_response(data=token_signer.issue(user['username']), message='Login successful')
         return create_response(error='Invalid credentials', status=401)
+    except PasswordHasherBusy:
+        return busy_response()
+    except Exception as e:
+        return create_response(error=str(e), status=500)
+
+@app.route('/token/refresh', methods=['POST'])
+def refresh_token():
+    """Exchange a refresh token for a new access/refresh token pair."""
+    refresh = (request.json or {}).get('refresh_token')
+    if not refresh:
+        return create_response(error='refresh_token is required', status=400)
+    try:
+        return create_response(data=token_signer.refresh(refresh))
+    except InvalidToken as e:
+        return create_response(error=str(e), status=401)
+
+@app.route('/logout', methods=['POST'])
+@require_auth
+def logout():
+    """Revoke the access token and, if given, the refresh token."""
+    token_signer.revoke(g.token)
+    refresh = (request.get_json(silent=True) or {}).get('refresh_token')
+    if refresh:
+        try:
+            token_signer.revoke(token_signer.verify(refresh, token_type='refresh'))
+        except InvalidToken:
+            pass
+    return create_response(message='Logged out')
+
+@app.route('/session', methods=['GET'])
+@require_auth
+def get_session():
+    """Return the user an access token belongs to."""
+    return create_response(data={'username': g.username, 'expires_at': g.token['exp']})
+
+@app.route('/profile/<username>', methods=['GET'])
+def get_profile(username):
+    try:
+        user = get_user(username)
+        if not user:
+            return create_response(error='User not found', status=404)
+
+        profile = {k: v for k, v in user.items() if k != 'password'}
+        return create_response(data={'user': profile})
+    except Exception as e:
+        return create_response(error=str(e), status=500)
+
+@app.route('/profile/<username>', methods=['PUT'])
+def update_profile(username):
+    try:
+        data = request.json
+        errors = validate_data(data, PROFILE_SCHEMA)
+        if errors:
+            return create_response(error=errors, status=400)
+
+        updates = {field: data[field] for field in PROFILE_SCHEMA if field in data}
+        if 'skills' in updates:
+            updates['skills'] = canonical_skills(updates['skills'])
+        response = supabase.table('users').update(updates).eq('username', username).execute()
+        if not response.data:
+            return create_response(error='User not found', status=404)
+
+        user = response.data[0]
+        user_cache.put(username, user)
+        upsert_volunteer({
+            'username': username,
+            'email': user.get('email'),
+            'skills': user.get('skills', [])
+        })
+
+        profile = {k: v for k, v in user.items() if k != 'password'}
+        return create_response(
+            data={'user': profile},
+            message='Profile updated successfully'
+        )
     except Exception as e:
         return create_response(error=str(e), status=500)
 
@@ -211,18 +586,30 @@ def handle_event():
         try:
             data = request.json
             errors = validate_data(data, EVENT_SCHEMA)
+            if not errors and not canonical_skills(data['requiredSkills']):
+                errors.append('requiredSkills must contain at least one skill.')
             if errors:
                 return create_response(error=errors, status=400)
 
             event = {
                 'eventName': data['eventName'],
                 'location': data['location'],
-                'requiredSkills': data['requiredSkills'],
+                'requiredSkills': canonical_skills(data['requiredSkills']),
                 'urgency': data['urgency'],
                 'eventDate': data['eventDate'],
                 'createdAt': datetime.now(timezone.utc).isoformat()
             }
-            supabase.table('events').insert(event).execute()
+            created = supabase.table('events').insert(event).execute()
+            upsert_event(created.data[0] if created.data else event)
+
+            # Let the best-matching volunteers know about the new event
+            create_notifications(
+                [match['username'] for match in find_best_matches(event)],
+                'New event matching your skills: {event_name}',
+                'event_match',
+                event['eventName'],
+                context={'event_name': event['eventName']}
+            )
 
             return create_response(
                 data={'event': event},
@@ -240,8 +627,16 @@ def get_event_matches(event_name):
         event = event_response.data[0] if event_response.data else None
         if not event:
             return create_response(error='Event not found', status=404)
-        
-        matches = find_best_matches(event)
+
+        threshold, max_matches, errors = parse_match_params(request.args)
+        if errors:
+            return create_response(error=errors, status=400)
+
+        generation = match_cache.generation()
+        matches = match_cache.get_event(event, threshold, max_matches)
+        if matches is None:
+            matches = find_best_matches(event, max_matches=max_matches, threshold=threshold)
+            match_cache.put_event(event, matches, threshold, max_matches, generation)
         return create_response(data={'matches': matches})
     except Exception as e:
         return create_response(error=str(e), status=500)
@@ -250,47 +645,246 @@ def get_event_matches(event_name):
 def get_volunteer_matches(username):
     """Get matching events for a volunteer."""
     try:
-        user_response = supabase.table('users').select("*").eq('username', username).execute()
-        user = user_response.data[0] if user_response.data else None
+        user = get_user(username)
         if not user:
             return create_response(error='User not found', status=404)
             
-        matching_events = []
-        for event in db['events']:
-            score = calculate_match_score(user.get('skills', []), event['requiredSkills'])
-            if score > 50:
-                matching_events.append({
-                    'event': event,
-                    'matchScore': score
-                })
-                
+        generation = match_cache.generation()
+        matching_events = match_cache.get_volunteer(user)
+        if matching_events is None:
+            # Only upcoming events sharing one of the volunteer's skills are scored
+            matching_events = event_index.match(user.get('skills', []))
+            match_cache.put_volunteer(user, matching_events, generation=generation)
         return create_response(data={'matches': matching_events})
     except Exception as e:
         return create_response(error=str(e), status=500)
 
+@app.route('/matches/events', methods=['POST'])
+def get_batch_event_matches():
+    """Get matches for many events in one request."""
+    try:
+        data = request.json or {}
+        errors = validate_data(data, MATCH_BATCH_SCHEMA)
+        if errors:
+            return create_response(error=errors, status=400)
+
+        event_names = data.get('event_names', [])
+        event_ids = data.get('event_ids', [])
+        if not event_names and not event_ids:
+            errors.append('event_names or event_ids is required.')
+        try:
+            # events.id is a uuid column; anything else would fail the cast in Postgres
+            event_ids = [str(uuid.UUID(event_id)) for event_id in event_ids]
+        except ValueError:
+            errors.append('event_ids must be UUIDs.')
+        if len(event_names) + len(event_ids) > MAX_BATCH_EVENTS:
+            errors.append(f'At most {MAX_BATCH_EVENTS} events can be matched per request.')
+        threshold, max_matches, param_errors = parse_match_params(data)
+        errors.extend(param_errors)
+        if errors:
+            return create_response(error=errors, status=400)
+
+        events = fetch_events(event_names, event_ids)
+
+        # Serve cached events and match the rest against the pool in one pass
+        generation = match_cache.generation()
+        results = {}
+        misses = []
+        for event in events:
+            matches = match_cache.get_event(event, threshold, max_matches)
+            if matches is None:
+                misses.append(event)
+            else:
+                results[event_key(event)] = matches
+        if misses:
+            for entry in match_all_events(misses, threshold=threshold, max_matches=max_matches):
+                match_cache.put_event(entry['event'], entry['matches'], threshold, max_matches, generation)
+                results[event_key(entry['event'])] = entry['matches']
+
+        found_names = {event['eventName'] for event in events}
+        found_ids = {event.get('id') for event in events}
+        missing = [name for name in event_names if name not in found_names]
+        missing += [event_id for event_id in event_ids if event_id not in found_ids]
+
+        return create_response(data={
+            'matches': [{'event': event, 'matches': results[event_key(event)]} for event in events],
+            'missing': missing
+        })
+    except Exception as e:
+        return create_response(error=str(e), status=500)
+
+@app.route('/admin/matches', methods=['GET'])
+def get_all_event_matches():
+    """Get matches for every upcoming event in one bulk pass."""
+    try:
+        threshold, max_matches, errors = parse_match_params(request.args)
+        if errors:
+            return create_response(error=errors, status=400)
+
+        matches = match_all_events(threshold=threshold, max_matches=max_matches)
+        return create_response(data={'matches': matches})
+    except Exception as e:
+        return create_response(error=str(e), status=500)
+
+@app.route('/admin/matches/cache', methods=['GET'])
+def get_match_cache_stats():
+    """Report match cache hit and miss counters."""
+    return create_response(data={'cache': match_cache.stats()})
+
+@app.route('/admin/notifications/stats', methods=['GET'])
+def get_notification_stats():
+    """Report notification batch writes, their latency and compaction."""
+    return create_response(data={
+        'notifications': notification_store.stats(),
+        'compaction': notification_compactor.stats()
+    })
+
+@app.route('/admin/passwords/stats', methods=['GET'])
+def get_password_stats():
+    """Report password hashing pool usage and queue depth."""
+    return create_response(data={'passwords': password_hasher.stats()})
+
+@app.route('/admin/users/stats', methods=['GET'])
+def get_user_cache_stats():
+    """Report user cache size and hit rate."""
+    return create_response(data={'users': user_cache.stats()})
+
+@app.route('/admin/notifications/compact', methods=['POST'])
+def compact_notifications():
+    """Apply the notification retention policy now."""
+    try:
+        reclaimed = notification_compactor.run_once()
+        return create_response(data={'reclaimed': reclaimed}, message='Notifications compacted')
+    except Exception as e:
+        return create_response(error=str(e), status=500)
+
 
 @app.route('/notifications/<username>', methods=['GET'])
 def get_notifications(username):
-    """Get all notifications for a user."""
+    """Get a page of a user's notifications, newest first.
+
+    Query parameters: ``limit``, ``before`` (a cursor; returns older
+    notifications), ``after`` (a cursor; returns only newer ones) and
+    ``unread_only``. ``next_cursor`` pages back and ``latest_cursor`` is
+    passed as ``after`` to poll for new notifications.
+    """
+    try:
+        errors = []
+        try:
+            limit = int(request.args.get('limit', DEFAULT_NOTIFICATION_PAGE))
+        except (TypeError, ValueError):
+            limit = None
+        if limit is None or not 1 <= limit <= MAX_NOTIFICATION_PAGE:
+            errors.append(f'limit must be an integer between 1 and {MAX_NOTIFICATION_PAGE}.')
+        cursors = {}
+        for name in ('before', 'after'):
+            if request.args.get(name):
+                try:
+                    cursors[name] = decode_cursor(request.args[name])
+                except ValueError:
+                    errors.append(f'{name} must be a cursor returned by this endpoint.')
+        if len(cursors) > 1:
+            errors.append('Use either before or after, not both.')
+        if errors:
+            return create_response(error=errors, status=400)
+
+        unread_only = request.args.get('unread_only', '').lower() in ('1', 'true', 'yes')
+        notifications = notification_store.page(username, limit, unread_only=unread_only, **cursors)
+
+        next_cursor = encode_cursor(notifications[-1]) if len(notifications) == limit and 'after' not in cursors else None
+        latest_cursor = encode_cursor(notifications[0]) if notifications else request.args.get('after')
+        return create_response(data={
+            'notifications': notifications,
+            'next_cursor': next_cursor,
+            'latest_cursor': latest_cursor
+        })
+    except Exception as e:
+        return create_response(error=str(e), status=500)
+
+def format_stream_event(notification):
+    """Render a notification as a Server-Sent Event whose ID is its feed cursor."""
+    return f"id: {encode_cursor(notification)}\nevent: notification\ndata: {json.dumps(notification)}\n\n"
+
+@app.route('/notifications/<username>/stream', methods=['GET'])
+def stream_notifications(username):
+    """Push new notifications as Server-Sent Events.
+
+    A reconnecting client's ``Last-Event-ID`` (or ``last_event_id`` query
+    parameter) is a feed cursor; notifications after it are replayed from the
+    store before live ones. The stream ends when the client falls too far
+    behind, and the browser reconnects from its last event.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
     try:
-        user_notifications = db['notifications'].get(username, [])
-        return create_response(data={'notifications': user_notifications})
+        resume_from = decode_cursor(last_event_id) if last_event_id else None
+    except ValueError:
+        return create_response(error='Last-Event-ID must be a cursor sent by this stream.', status=400)
+
+    # Subscribe before replaying so nothing created in between is missed
+    subscription = notification_hub.subscribe(username)
+
+    def events():
+        newest = resume_from
+        try:
+            # Browsers reconnect after 3 seconds, sending the last event ID
+            yield "retry: 3000\n\n"
+            while newest is not None:
+                replay = notification_store.page(username, MAX_NOTIFICATION_PAGE, after=newest)
+                for notification in reversed(replay):
+                    yield format_stream_event(notification)
+                if replay:
+                    newest = position(replay[0])
+                if len(replay) < MAX_NOTIFICATION_PAGE:
+                    break
+            while not subscription.closed:
+                notification = subscription.get(timeout=STREAM_KEEPALIVE)
+                if notification is None:
+                    yield ": keep-alive\n\n"
+                elif newest is None or position(notification) > newest:
+                    yield format_stream_event(notification)
+        finally:
+            notification_hub.unsubscribe(subscription)
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/notifications/<username>/unread-count', methods=['GET'])
+def get_unread_count(username):
+    """Get the number of unread notifications for a user."""
+    try:
+        return create_response(data={'unread': notification_store.unread_count(username)})
     except Exception as e:
         return create_response(error=str(e), status=500)
 
 @app.route('/notifications/<username>/mark-read', methods=['POST'])
 def mark_notifications_read(username):
-    """Mark notifications as read."""
+    """Mark notifications as read: by ID, all of them ("all": true), or up to an ID ("up_to")."""
     try:
-        notification_ids = request.json.get('notification_ids', [])
-        if username not in db['notifications']:
+        data = request.json or {}
+        notification_ids = data.get('notification_ids')
+        if notification_ids is not None and not isinstance(notification_ids, list):
+            return create_response(error='notification_ids must be of type list.', status=400)
+        up_to = data.get('up_to')
+        try:
+            if notification_ids is not None:
+                notification_ids = [parse_notification_id(notification_id) for notification_id in notification_ids]
+            if up_to is not None:
+                up_to = parse_notification_id(up_to)
+        except ValueError as e:
+            return create_response(error=str(e), status=400)
+
+        marked = notification_store.mark_read(
+            username,
+            notification_ids,
+            up_to=up_to,
+            mark_all=bool(data.get('all'))
+        )
+        if not marked and not notification_store.get(username):
             return create_response(error='No notifications found', status=404)
-            
-        for notification in db['notifications'][username]:
-            if notification['id'] in notification_ids:
-                notification['read'] = True
-                
-        return create_response(message='Notifications marked as read')
+
+        return create_response(data={'marked': marked}, message='Notifications marked as read')
     except Exception as e:
         return create_response(error=str(e), status=500)
 
@@ -311,8 +905,7 @@ def add_volunteer_event(username):
     try:
         data = request.json
         # Ensure that user exists before adding history
-        user_response = supabase.table('users').select("*").eq('username', username).execute()
-        if not user_response.data:
+        if not get_user(username):
             return jsonify({'error': 'User not found'}), 404
         
         event = {
@@ -335,4 +928,10 @@ app.register_blueprint(reporting, url_prefix="/admin")
 
 # Start the server
 if __name__ == '__main__':
+    load_volunteer_pool()
+    load_event_catalog()
+    # Only the reloader's child process serves requests and runs background jobs
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        reminder_scheduler.start()
+        notification_compactor.start()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,118 @@
+"""Compare in-process matching with the match_volunteers Postgres function.
+
+Loads a seeded synthetic volunteer pool into ``public.users`` of a scratch
+database (``database/schema.sql`` applied), then times the same events
+against the pairwise scorer, the in-process skill index and the SQL function,
+and checks that all three return identical matches.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.match_backends --sizes 10000 100000 1000000
+
+Requires psycopg2. Results are printed as one JSON object per line.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('SUPABASE_URL', 'http://localhost')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+
+from app import calculate_match_score
+from matching import VolunteerSkillIndex
+from benchmarks.synthetic import generate_events, generate_users
+
+
+def pairwise_matches(users, event, threshold=50, max_matches=5):
+    """The original full scan over every volunteer."""
+    scores = []
+    for user in users:
+        score = calculate_match_score(user['skills'], event['requiredSkills'])
+        if score > threshold:
+            scores.append({'username': user['username'], 'score': score, 'email': user['email']})
+    return sorted(scores, key=lambda x: (-x['score'], x['username']))[:max_matches]
+
+def load_users(conn, users):
+    """Replace the contents of public.users with the synthetic pool."""
+    buffer = io.StringIO()
+    for user in users:
+        skills = '{' + ','.join('"{}"'.format(skill) for skill in user['skills']) + '}'
+        buffer.write(f"{user['username']}\t{user['email']}\tbenchmark\t{skills}\n")
+    buffer.seek(0)
+    with conn.cursor() as cursor:
+        cursor.execute('delete from public.users')
+        cursor.copy_from(buffer, 'users', columns=('username', 'email', 'password', 'skills'))
+        cursor.execute('analyze public.users')
+    conn.commit()
+
+def timed(fn, events):
+    start = time.perf_counter()
+    results = [fn(event) for event in events]
+    return (time.perf_counter() - start) / len(events), results
+
+def run(conn, size, events_per_size, pairwise_limit, seed):
+    rng = random.Random(seed)
+    users = generate_users(rng, size, prefix='bench_user')
+    events = generate_events(rng, events_per_size)
+    load_users(conn, users)
+
+    index = VolunteerSkillIndex()
+    start = time.perf_counter()
+    index.build(users)
+    build_seconds = time.perf_counter() - start
+
+    def database_matches(event):
+        with conn.cursor() as cursor:
+            cursor.execute(
+                'select username, email, score from public.match_volunteers(%s, %s, %s)',
+                (event['requiredSkills'], 50, 5)
+            )
+            return [{'username': u, 'score': s, 'email': e} for u, e, s in cursor.fetchall()]
+
+    index_seconds, index_results = timed(lambda event: index.match(event['requiredSkills']), events)
+    database_seconds, database_results = timed(database_matches, events)
+    result = {
+        'users': size,
+        'events': len(events),
+        'index_build_seconds': build_seconds,
+        'index_seconds_per_event': index_seconds,
+        'database_seconds_per_event': database_seconds,
+        'database_matches_index': database_results == index_results
+    }
+
+    # The full scan is only timed on a few events for large pools
+    sample = events[:pairwise_limit]
+    if sample:
+        pairwise_seconds, pairwise_results = timed(lambda event: pairwise_matches(users, event), sample)
+        result['pairwise_seconds_per_event'] = pairwise_seconds
+        result['pairwise_matches_index'] = pairwise_results == index_results[:len(sample)]
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--events', type=int, default=50)
+    parser.add_argument('--pairwise-events', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error('set DATABASE_URL or pass --database-url (a scratch database: public.users is replaced)')
+    try:
+        import psycopg2
+    except ImportError:
+        sys.exit('psycopg2 is required: pip install psycopg2-binary')
+
+    conn = psycopg2.connect(args.database_url)
+    try:
+        for size in args.sizes:
+            print(json.dumps(run(conn, size, args.events, args.pairwise_events, args.seed)), flush=True)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""Benchmark suite for matching, validation, reporting and reminders.
+
+Runs each benchmark on seeded synthetic data at one or more scales and emits
+JSON results tagged with the current commit, so runs can be compared:
+
+    python -m benchmarks.run --scales small medium --output before.json
+    python -m benchmarks.run --scales small medium --output after.json
+    python -m benchmarks.run --compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+os.environ.setdefault('SUPABASE_URL', 'http://localhost')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+
+import app
+from notifications import NotificationStore, SQLNotificationBackend
+from reporting import generate_csv, generate_pdf
+from benchmarks.synthetic import SCALES, generate_dataset
+
+HISTORY_HEADERS = [
+    "ID", "Username", "Event ID", "Date Volunteered", "Created At", "Hours Contributed",
+    "Required Skills", "Urgency", "Feedback", "Description", "Event Name", "Location", "Participation Status"
+]
+HISTORY_FIELDS = [
+    'id', 'username', 'eventid', 'datevolunteered', 'createdat', 'hourscontributed', 'requiredskills',
+    'urgency', 'feedback', 'description', 'eventname', 'location', 'participationstatus'
+]
+
+
+def measure(fn, repeat, number=1, setup=None):
+    """Time ``fn`` and return per-call statistics in seconds."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        'calls': number,
+        'repeat': repeat,
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.mean(samples)
+    }
+
+def history_rows(history):
+    return [
+        [", ".join(entry[field]) if field == 'requiredskills' else entry[field] for field in HISTORY_FIELDS]
+        for entry in history
+    ]
+
+def memory_notification_store(backend=None):
+    """A notification store on an in-memory SQLite database (empty unless ``backend`` is given)."""
+    if backend is None:
+        backend = SQLNotificationBackend(sqlite3.connect(':memory:', check_same_thread=False))
+        backend.create_table()
+    return NotificationStore(backend, flush_interval=None)
+
+def load_dataset(data):
+    """Load a dataset into the app's in-process state."""
+    app.db['users'] = data['users']
+    app.db['events'] = data['events']
+    app.notification_store = memory_notification_store()
+    app.rebuild_volunteer_index()
+    app.rebuild_event_index()
+
+def run_scale(scale, seed, repeat):
+    data = generate_dataset(scale, seed)
+    rng = random.Random(seed)
+    users, events = data['users'], data['events']
+    pairs = [(rng.choice(users)['skills'], rng.choice(events)['requiredSkills']) for _ in range(1000)]
+    sample_events = rng.sample(events, min(50, len(events)))
+    notifications = data['notifications']
+    recipients = sorted({entry['username'] for entry in notifications})
+    sample_recipients = rng.sample(recipients, min(100, len(recipients)))
+    rows = history_rows(data['history'])
+    payloads = [
+        {'username': user['username'], 'password': user['password'], 'email': user['email'], 'skills': user['skills']}
+        for user in users[:1000]
+    ]
+    load_dataset(data)
+
+    def match_scores():
+        for volunteer_skills, required_skills in pairs:
+            app.calculate_match_score(volunteer_skills, required_skills)
+
+    def best_matches():
+        for event in sample_events:
+            app.find_best_matches(event)
+
+    def validate():
+        for payload in payloads:
+            app.validate_data(payload, app.USER_SCHEMA)
+        for event in events[:1000]:
+            app.validate_data(event, app.EVENT_SCHEMA)
+
+    def reset_notifications():
+        app.notification_store = memory_notification_store()
+
+    # Each notification benchmark starts from a fresh store; reads use a second, cold store on the same table
+    stores = {}
+
+    def empty_store():
+        stores['writer'] = memory_notification_store()
+
+    def filled_store():
+        empty_store()
+        stores['writer'].create_batch(notifications)
+        stores['reader'] = memory_notification_store(stores['writer'].backend)
+
+    def create_notifications():
+        stores['writer'].create_batch(notifications)
+
+    def page_notifications():
+        for username in sample_recipients:
+            stores['reader'].page(username, limit=app.DEFAULT_NOTIFICATION_PAGE)
+
+    def mark_notifications_read():
+        for username in sample_recipients:
+            stores['reader'].mark_read(username, mark_all=True)
+
+    benchmarks = {
+        'calculate_match_score': (measure(match_scores, repeat), len(pairs)),
+        'rebuild_volunteer_index': (measure(app.rebuild_volunteer_index, repeat), 1),
+        'find_best_matches': (measure(best_matches, repeat), len(sample_events)),
+        'validate_data': (measure(validate, repeat), len(payloads) + min(len(events), 1000)),
+        'generate_csv': (measure(lambda: generate_csv(rows, HISTORY_HEADERS), repeat), 1),
+        'generate_pdf': (measure(lambda: generate_pdf(rows, HISTORY_HEADERS, 'Volunteer History Report'), repeat), 1),
+        'check_upcoming_events': (measure(lambda: app.check_upcoming_events(test_mode=True), repeat,
+                                          setup=reset_notifications), 1),
+        'notification_create_batch': (measure(create_notifications, repeat, setup=empty_store), len(notifications)),
+        'notification_page': (measure(page_notifications, repeat, setup=filled_store), len(sample_recipients)),
+        'notification_mark_read': (measure(mark_notifications_read, repeat, setup=filled_store),
+                                   len(sample_recipients))
+    }
+    counts = SCALES[scale]
+    return [
+        dict(scale=scale, benchmark=name, items_per_call=items, rows=counts, **stats)
+        for name, (stats, items) in benchmarks.items()
+    ]
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(before_path, after_path):
+    """Print the median time ratio (after / before) for each benchmark."""
+    with open(before_path) as f:
+        before = {(r['scale'], r['benchmark']): r for r in json.load(f)['results']}
+    with open(after_path) as f:
+        after = json.load(f)['results']
+    print(f"{'scale':<8} {'benchmark':<26} {'before (s)':>12} {'after (s)':>12} {'ratio':>7}")
+    for result in after:
+        base = before.get((result['scale'], result['benchmark']))
+        if base is None:
+            continue
+        ratio = result['median'] / base['median'] if base['median'] else float('inf')
+        print(f"{result['scale']:<8} {result['benchmark']:<26} {base['median']:>12.6f} {result['median']:>12.6f} {ratio:>7.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', nargs='+', choices=sorted(SCALES), default=['small'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write results to this file instead of stdout')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two result files')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = {
+        'commit': git_commit(),
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'results': [result for scale in args.scales for result in run_scale(scale, args.seed, args.repeat)]
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        sys.stdout.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
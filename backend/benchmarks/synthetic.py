@@ -0,0 +1,101 @@
+"""Seeded synthetic data for benchmarks.
+
+Every generator takes a ``random.Random`` so a given seed always produces the
+same users, events, history rows and notifications.
+"""
+import random
+from datetime import datetime, timedelta
+
+SKILLS = [f'Skill {i}' for i in range(200)]
+LOCATIONS = ['Houston, TX', 'Austin, TX', 'Dallas, TX', 'San Antonio, TX', 'El Paso, TX']
+URGENCIES = ['low', 'medium', 'high']
+NOTIFICATION_TYPES = ['general', 'event_match', 'event_reminder']
+
+# Row counts per scale
+SCALES = {
+    'small': {'users': 1000, 'events': 100, 'history': 1000, 'notifications': 2000},
+    'medium': {'users': 10000, 'events': 1000, 'history': 10000, 'notifications': 20000},
+    'large': {'users': 100000, 'events': 5000, 'history': 50000, 'notifications': 200000}
+}
+
+# Skill popularity follows a long tail: a few skills are very common
+SKILL_WEIGHTS = [1 / (rank + 1) for rank in range(len(SKILLS))]
+
+
+def sample_skills(rng, low, high):
+    return list(dict.fromkeys(rng.choices(SKILLS, SKILL_WEIGHTS, k=rng.randint(low, high))))
+
+def generate_users(rng, count, prefix='user'):
+    return [
+        {
+            'username': f'{prefix}_{i}',
+            'password': 'benchmark',
+            'email': f'{prefix}_{i}@example.com',
+            'skills': sample_skills(rng, 0, 6),
+            'preferences': rng.choice(['Weekends', 'Evenings', ''])
+        }
+        for i in range(count)
+    ]
+
+def generate_events(rng, count, now=None, days=60):
+    """Events spread from ``days`` in the past to ``days`` in the future."""
+    now = now or datetime.now()
+    return [
+        {
+            'id': f'event-{i}',
+            'eventName': f'Event {i}',
+            'location': rng.choice(LOCATIONS),
+            'requiredSkills': sample_skills(rng, 1, 4),
+            'urgency': rng.choice(URGENCIES),
+            'eventDate': (now + timedelta(days=rng.randint(-days, days))).strftime('%Y-%m-%d'),
+            'createdAt': now.isoformat()
+        }
+        for i in range(count)
+    ]
+
+def generate_history(rng, count, users, events):
+    rows = []
+    for i in range(count):
+        event = rng.choice(events)
+        rows.append({
+            'id': f'history-{i}',
+            'username': rng.choice(users)['username'],
+            'eventid': event['id'],
+            'datevolunteered': event['eventDate'],
+            'createdat': event['createdAt'],
+            'hourscontributed': rng.randint(1, 8),
+            'requiredskills': event['requiredSkills'],
+            'urgency': event['urgency'],
+            'feedback': rng.choice(['Great experience', 'Well organized', '']),
+            'description': f"Helped at {event['eventName']}",
+            'eventname': event['eventName'],
+            'location': event['location'],
+            'participationstatus': rng.choice(['completed', 'registered', 'cancelled'])
+        })
+    return rows
+
+def generate_notifications(rng, count, users, events):
+    """Notification entries in creation order, as passed to NotificationStore.create_batch."""
+    notifications = []
+    for _ in range(count):
+        event = rng.choice(events)
+        notifications.append({
+            'username': rng.choice(users)['username'],
+            'message': f"New event: {event['eventName']}",
+            'type': rng.choice(NOTIFICATION_TYPES),
+            'related_id': event['eventName']
+        })
+    return notifications
+
+def generate_dataset(scale, seed=0, now=None):
+    """Generate users, events, history rows and notifications for a scale."""
+    counts = SCALES[scale] if isinstance(scale, str) else scale
+    rng = random.Random(seed)
+    users = generate_users(rng, counts['users'])
+    events = generate_events(rng, counts['events'], now)
+    return {
+        'users': users,
+        'events': events,
+        'history': generate_history(rng, counts['history'], users, events),
+        'notifications': generate_notifications(rng, counts['notifications'], users, events)
+    }
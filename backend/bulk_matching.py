@@ -0,0 +1,289 @@
+import heapq
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from itertools import islice
+
+from matching import VolunteerSkillIndex, skill_vocabulary
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # numpy/scipy are optional; fall back to the skill index
+    np = None
+    sparse = None
+
+
+class BulkMatcher:
+    """Match many events against the whole volunteer pool at once.
+
+    Skills are encoded by their vocabulary IDs, which double as column indices,
+    and volunteers as rows of a sparse binary matrix. The overlap counts for a batch of events come out of a single
+    sparse matrix product, and scores and top-k selection follow the same rules
+    as ``calculate_match_score`` and ``find_best_matches``: a score is
+    ``(overlap / required) * 100``, only scores above the threshold are kept,
+    and ties are broken by username.
+
+    Without numpy/scipy installed the matcher answers the same queries through
+    ``VolunteerSkillIndex``.
+    """
+
+    def __init__(self, volunteers, vocabulary=None):
+        self.vocabulary = vocabulary or skill_vocabulary
+        self.volunteers = [
+            {'username': user['username'], 'email': user.get('email'), 'skills': user.get('skills') or []}
+            for user in volunteers
+        ]
+        self._index = None
+        self._matrix = None
+
+        if np is None:
+            self._index = VolunteerSkillIndex(self.vocabulary)
+            self._index.build(self.volunteers)
+            return
+
+        rows, cols = [], []
+        for row, volunteer in enumerate(self.volunteers):
+            for skill_id in self.vocabulary.ids(volunteer['skills']):
+                rows.append(row)
+                cols.append(skill_id)
+
+        self._columns = len(self.vocabulary)
+        self._matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(len(self.volunteers), self._columns)
+        )
+        # Position of each volunteer in username order, used to break ties
+        usernames = np.array([volunteer['username'] for volunteer in self.volunteers])
+        self._rank = np.empty(len(usernames), dtype=np.int64)
+        self._rank[np.argsort(usernames, kind='stable')] = np.arange(len(usernames))
+
+    @property
+    def vectorized(self):
+        return self._matrix is not None
+
+    def _encode_events(self, events):
+        """Encode events as a sparse skill matrix plus their required-skill counts."""
+        rows, cols = [], []
+        totals = np.zeros(len(events), dtype=np.float64)
+        for row, event in enumerate(events):
+            required_skills = self.vocabulary.ids(event.get('requiredSkills'))
+            totals[row] = len(required_skills)
+            for skill_id in required_skills:
+                # Skills registered after the pool was encoded still count towards the total
+                if skill_id < self._columns:
+                    rows.append(row)
+                    cols.append(skill_id)
+
+        matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(len(events), self._columns)
+        )
+        return matrix, totals
+
+    def score_matrix(self, events):
+        """Return the volunteers x events score matrix as a sparse CSC matrix."""
+        if not self.vectorized:
+            raise RuntimeError('numpy and scipy are required for the score matrix')
+
+        event_matrix, totals = self._encode_events(events)
+        scores = (self._matrix @ event_matrix.T).tocsc().astype(np.float64)
+
+        # Scale each column by its event's required-skill count in one pass
+        column_totals = np.repeat(totals, np.diff(scores.indptr))
+        scores.data = (scores.data / column_totals) * 100
+        return scores
+
+    def match_events(self, events, threshold=50, max_matches=5):
+        """Return the top matches for each event, in the order of ``events``."""
+        if not self.vectorized:
+            return [
+                self._index.match(event.get('requiredSkills'), threshold=threshold, max_matches=max_matches)
+                for event in events
+            ]
+
+        scores = self.score_matrix(events)
+        results = []
+        for column in range(len(events)):
+            start, end = scores.indptr[column], scores.indptr[column + 1]
+            rows = scores.indices[start:end]
+            values = scores.data[start:end]
+
+            keep = values > threshold
+            rows, values = rows[keep], values[keep]
+            # Highest score first, ties broken by username
+            order = np.lexsort((self._rank[rows], -values))[:max_matches]
+
+            results.append([
+                {
+                    'username': self.volunteers[row]['username'],
+                    'score': float(value),
+                    'email': self.volunteers[row]['email']
+                }
+                for row, value in zip(rows[order].tolist(), values[order].tolist())
+            ])
+        return results
+
+
+def bulk_match(volunteers, events, threshold=50, max_matches=5):
+    """Match every event against the volunteer pool in one pass.
+
+    Returns a list of ``{'event': event, 'matches': [...]}`` entries in the
+    order of ``events``.
+    """
+    matcher = BulkMatcher(volunteers)
+    matches = matcher.match_events(events, threshold=threshold, max_matches=max_matches)
+    return [{'event': event, 'matches': event_matches} for event, event_matches in zip(events, matches)]
+
+
+# The one chunk of the volunteer pool a worker process matches against, set by the pool initializer
+_worker_matcher = None
+
+def _init_worker(chunk):
+    global _worker_matcher
+    _worker_matcher = BulkMatcher(chunk)
+
+def _match_chunk(events, threshold, max_matches):
+    """Match events against this worker's chunk of the pool."""
+    return _worker_matcher.match_events(events, threshold=threshold, max_matches=max_matches)
+
+def _start_method():
+    """Start workers without forking the (threaded) parent where possible."""
+    return 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+def merge_top_k(ranked_lists, max_matches):
+    """Merge per-chunk top-k lists, each already ranked by score then username."""
+    return list(islice(
+        heapq.merge(*ranked_lists, key=lambda match: (-match['score'], match['username'])),
+        max_matches
+    ))
+
+
+class ParallelMatcher:
+    """Bulk matching spread over a pool of worker processes.
+
+    The volunteer pool is split into one chunk per worker, and each chunk gets
+    its own single-process executor whose initializer receives only that
+    chunk, so the pool is held once across the workers. Every task only
+    carries the events to match. Each worker returns its chunk's top-k per
+    event and the parent merges them. Pools smaller than ``min_pool_size``, or
+    a single worker, are matched in-process by ``BulkMatcher``.
+
+    Workers are started with ``forkserver`` (``spawn`` where that is not
+    available) rather than forked from the threaded server, so they cannot
+    inherit a lock some other thread was holding. If the workers have not
+    answered within ``timeout`` seconds the executors are retired and the
+    batch is matched in-process instead.
+
+    Callers sharing a matcher ``retain`` it while matching and ``release`` it
+    afterwards. ``close`` does not wait for running matches: the workers are
+    shut down once the last retained caller releases the matcher, and a
+    closed matcher refuses to start new workers.
+    """
+
+    def __init__(self, volunteers, workers=None, min_pool_size=20000, timeout=None):
+        volunteers = list(volunteers)
+        self.workers = workers or int(os.getenv('MATCH_WORKERS', os.cpu_count() or 1))
+        self.timeout = timeout if timeout is not None else float(os.getenv('MATCH_TIMEOUT', 60))
+        self._executors = None
+        self._fallback = None
+        self._local = None
+        self._lock = threading.Lock()
+        self._users = 0
+        self._closed = False
+
+        if self.workers <= 1 or len(volunteers) < min_pool_size:
+            self._local = BulkMatcher(volunteers)
+            self.chunks = []
+            return
+
+        chunk_size = -(-len(volunteers) // self.workers)
+        self.chunks = [
+            [
+                {'username': user['username'], 'email': user.get('email'), 'skills': user.get('skills') or []}
+                for user in volunteers[start:start + chunk_size]
+            ]
+            for start in range(0, len(volunteers), chunk_size)
+        ]
+
+    @property
+    def parallel(self):
+        return self._local is None
+
+    def retain(self):
+        """Register a caller that is about to match; raises RuntimeError once closed."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('ParallelMatcher is closed')
+            self._users += 1
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            executors = self._retire() if self._closed and not self._users else None
+        self._shutdown(executors)
+
+    def match_events(self, events, threshold=50, max_matches=5):
+        """Return the top matches for each event, in the order of ``events``."""
+        if not self.parallel:
+            return self._local.match_events(events, threshold=threshold, max_matches=max_matches)
+
+        # Only the skills travel with each task
+        payload = [{'requiredSkills': event.get('requiredSkills') or []} for event in events]
+        with self._lock:
+            if self._closed and not self._users:
+                raise RuntimeError('ParallelMatcher is closed')
+            if self._executors is None:
+                context = multiprocessing.get_context(_start_method())
+                self._executors = [
+                    ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_worker,
+                                        initargs=(chunk,))
+                    for chunk in self.chunks
+                ]
+            executors = self._executors
+            futures = [
+                executor.submit(_match_chunk, payload, threshold, max_matches)
+                for executor in executors
+            ]
+        _, pending = wait(futures, timeout=self.timeout)
+        if pending:
+            print(f"Bulk matching workers did not answer within {self.timeout}s; matching in-process")
+            return self._match_locally(executors, events, threshold, max_matches)
+        per_chunk = [future.result() for future in futures]
+        return [
+            merge_top_k([chunk_results[i] for chunk_results in per_chunk], max_matches)
+            for i in range(len(events))
+        ]
+
+    def _match_locally(self, stuck, events, threshold, max_matches):
+        with self._lock:
+            # Later calls start fresh workers rather than queue behind the stuck ones
+            executors = self._retire() if self._executors is stuck else None
+            if self._fallback is None:
+                self._fallback = BulkMatcher([user for chunk in self.chunks for user in chunk])
+            matcher = self._fallback
+        self._shutdown(executors)
+        return matcher.match_events(events, threshold=threshold, max_matches=max_matches)
+
+    def _retire(self):
+        executors, self._executors = self._executors, None
+        return executors
+
+    @staticmethod
+    def _shutdown(executors):
+        for executor in executors or []:
+            executor.shutdown(wait=False)
+
+    def close(self):
+        """Shut down the worker processes once no retained caller is using them."""
+        with self._lock:
+            self._closed = True
+            executors = self._retire() if not self._users else None
+        self._shutdown(executors)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,458 @@
+import heapq
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime
+
+
+def normalize_skill(skill):
+    """Normalize a skill name: trim, collapse inner whitespace and lowercase."""
+    return ' '.join(skill.split()).lower()
+
+def canonical_skills(skills):
+    """Return normalized skills without blanks or duplicates, in their first order."""
+    canonical = dict.fromkeys(normalize_skill(skill) for skill in skills or [])
+    canonical.pop('', None)
+    return list(canonical)
+
+def parse_event_date(value):
+    """Parse an event date ('YYYY-MM-DD' or ISO 8601) into a naive datetime."""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+def minimum_overlap(total_required_skills, threshold):
+    """Return the fewest overlapping skills whose score is above ``threshold``."""
+    count = max(int(total_required_skills * threshold / 100), 1)
+    while count <= total_required_skills and (count / total_required_skills) * 100 <= threshold:
+        count += 1
+    return count
+
+def event_key(event):
+    """Return the key identifying an event in the indexes."""
+    return event.get('id') or event['eventName']
+
+
+class SkillVocabulary:
+    """Registry assigning a stable integer ID to every canonical skill.
+
+    IDs are handed out in first-seen order and never reused, so matching,
+    indexing and caching can work on small integer sets. Every spelling that
+    has been looked up is remembered, so skills stored in canonical form (or
+    seen before) resolve with a single dict lookup and no new strings.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def intern(self, skill):
+        """Return the ID for a skill, registering it if it is new."""
+        skill_id = self._ids.get(skill)
+        if skill_id is not None:
+            return skill_id
+
+        name = normalize_skill(skill)
+        with self._lock:
+            skill_id = self._ids.get(name)
+            if skill_id is None:
+                skill_id = len(self._names)
+                self._names.append(name)
+                self._ids[name] = skill_id
+            self._ids[skill] = skill_id
+        return skill_id
+
+    def ids(self, skills):
+        """Return the set of IDs for a list of skills."""
+        return frozenset(self.intern(skill) for skill in skills or [])
+
+    def name(self, skill_id):
+        """Return the canonical name for a skill ID."""
+        return self._names[skill_id]
+
+
+# Process-wide vocabulary shared by the matching indexes, caches and scorers
+skill_vocabulary = SkillVocabulary()
+
+
+class VolunteerSkillIndex:
+    """Inverted index from skill to the volunteers who list it.
+
+    Matching an event only touches the postings lists of its required skills,
+    so the cost grows with the number of volunteers sharing a skill with the
+    event rather than with the whole volunteer pool. Writes and lookups take
+    a lock, so request threads can match while a profile edit updates the
+    index.
+    """
+
+    def __init__(self, vocabulary=None):
+        self.vocabulary = vocabulary or skill_vocabulary
+        self._postings = defaultdict(set)
+        self._volunteers = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._volunteers)
+
+    def __contains__(self, username):
+        return username in self._volunteers
+
+    def _entry(self, user):
+        return {
+            'username': user['username'],
+            'email': user.get('email'),
+            'skills': self.vocabulary.ids(user.get('skills'))
+        }
+
+    def _add(self, volunteer):
+        username = volunteer['username']
+        self._remove(username)
+        self._volunteers[username] = volunteer
+        for skill in volunteer['skills']:
+            self._postings[skill].add(username)
+
+    def _remove(self, username):
+        volunteer = self._volunteers.pop(username, None)
+        if volunteer is None:
+            return
+        for skill in volunteer['skills']:
+            postings = self._postings[skill]
+            postings.discard(username)
+            if not postings:
+                del self._postings[skill]
+
+    def build(self, users):
+        """Rebuild the index from a list of user records."""
+        volunteers = [self._entry(user) for user in users]
+        with self._lock:
+            self._postings.clear()
+            self._volunteers.clear()
+            for volunteer in volunteers:
+                self._add(volunteer)
+
+    def add(self, user):
+        """Add or replace a volunteer in the index."""
+        volunteer = self._entry(user)
+        with self._lock:
+            self._add(volunteer)
+
+    def remove(self, username):
+        """Drop a volunteer from the index."""
+        with self._lock:
+            self._remove(username)
+
+    def _candidates(self, required_skills, min_overlap):
+        postings_lists = sorted(
+            (self._postings.get(skill, ()) for skill in required_skills),
+            key=len
+        )
+        overlap = {}
+        for position, postings in enumerate(postings_lists):
+            admit = len(postings_lists) - position >= min_overlap
+            for username in postings:
+                if username in overlap:
+                    overlap[username] += 1
+                elif admit and len(self._volunteers[username]['skills']) >= min_overlap:
+                    overlap[username] = 1
+        return overlap
+
+    def candidates(self, required_skills, min_overlap=1):
+        """Count overlapping skill IDs for volunteers that can reach ``min_overlap``.
+
+        Postings lists are walked shortest first. A volunteer first seen in a
+        later list can no longer reach ``min_overlap`` once too few lists remain,
+        and volunteers with fewer skills than ``min_overlap`` are never admitted,
+        so both are skipped before any scoring.
+        """
+        with self._lock:
+            return self._candidates(required_skills, min_overlap)
+
+    def match(self, event_required_skills, threshold=50, max_matches=5):
+        """Return the best volunteers for the given required skills.
+
+        Scores are identical to ``calculate_match_score``. The top
+        ``max_matches`` are selected with a bounded heap, highest score first
+        and ties broken by username.
+        """
+        required_skills = self.vocabulary.ids(event_required_skills)
+        if not required_skills or max_matches <= 0:
+            return []
+
+        total_required_skills = len(required_skills)
+        min_overlap = minimum_overlap(total_required_skills, threshold)
+        if min_overlap > total_required_skills:
+            return []
+
+        with self._lock:
+            scored = (
+                ((matching / total_required_skills) * 100, username)
+                for username, matching in self._candidates(required_skills, min_overlap).items()
+                if matching >= min_overlap
+            )
+            best = heapq.nsmallest(max_matches, scored, key=lambda match: (-match[0], match[1]))
+            return [
+                {
+                    'username': username,
+                    'score': score,
+                    'email': self._volunteers[username]['email']
+                }
+                for score, username in best
+            ]
+
+
+class EventSkillIndex:
+    """Reverse index from skill to the upcoming events that require it.
+
+    Only events dated today or later are indexed, and events that fall into the
+    past are pruned once a day on lookup, so a volunteer's matches are computed
+    from the events sharing one of their skills rather than from the whole
+    catalog. Writes, pruning and lookups take a lock.
+    """
+
+    def __init__(self, vocabulary=None):
+        self.vocabulary = vocabulary or skill_vocabulary
+        self._postings = defaultdict(set)
+        self._events = {}
+        self._order = {}
+        self._next_order = 0
+        self._pruned_on = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._events)
+
+    def __contains__(self, key):
+        return key in self._events
+
+    def _entry(self, event, today):
+        event_date = parse_event_date(event.get('eventDate'))
+        if event_date is None or event_date.date() < (today or date.today()):
+            return None
+        return {'event': event, 'skills': self.vocabulary.ids(event.get('requiredSkills')), 'date': event_date.date()}
+
+    def _add(self, key, entry):
+        self._remove(key)
+        if entry is None:
+            return
+        self._events[key] = entry
+        self._order[key] = self._next_order
+        self._next_order += 1
+        for skill in entry['skills']:
+            self._postings[skill].add(key)
+
+    def _remove(self, key):
+        entry = self._events.pop(key, None)
+        if entry is None:
+            return
+        del self._order[key]
+        for skill in entry['skills']:
+            postings = self._postings[skill]
+            postings.discard(key)
+            if not postings:
+                del self._postings[skill]
+
+    def _prune(self, today):
+        today = today or date.today()
+        if self._pruned_on == today:
+            return
+        for key in [key for key, entry in self._events.items() if entry['date'] < today]:
+            self._remove(key)
+        self._pruned_on = today
+
+    def build(self, events, today=None):
+        """Rebuild the index from a list of event records."""
+        entries = [(event_key(event), self._entry(event, today)) for event in events]
+        with self._lock:
+            self._postings.clear()
+            self._events.clear()
+            self._order.clear()
+            self._next_order = 0
+            self._pruned_on = today or date.today()
+            for key, entry in entries:
+                self._add(key, entry)
+
+    def add(self, event, today=None):
+        """Add or replace an event; past or undated events are not indexed."""
+        entry = self._entry(event, today)
+        with self._lock:
+            self._add(event_key(event), entry)
+
+    def remove(self, key):
+        """Drop an event from the index."""
+        with self._lock:
+            self._remove(key)
+
+    def prune(self, today=None):
+        """Remove events dated before today, at most once per day."""
+        with self._lock:
+            self._prune(today)
+
+    def events(self, today=None):
+        """Return the upcoming events in the order they were added."""
+        with self._lock:
+            self._prune(today)
+            return [self._events[key]['event'] for key in sorted(self._events, key=self._order.__getitem__)]
+
+    def match(self, volunteer_skills, threshold=50, today=None):
+        """Return the upcoming events a volunteer's skills match.
+
+        Scores are identical to ``calculate_match_score``; events keep the order
+        in which they were added to the index.
+        """
+        volunteer_skills = self.vocabulary.ids(volunteer_skills)
+        with self._lock:
+            self._prune(today)
+            overlap = defaultdict(int)
+            for skill in volunteer_skills:
+                for key in self._postings.get(skill, ()):
+                    overlap[key] += 1
+
+            matching_events = []
+            for key in sorted(overlap, key=self._order.__getitem__):
+                entry = self._events[key]
+                score = (overlap[key] / len(entry['skills'])) * 100
+                if score > threshold:
+                    matching_events.append({'event': entry['event'], 'matchScore': score})
+            return matching_events
+
+
+class MatchCache:
+    """Cache of match results keyed by event and by volunteer.
+
+    Each entry remembers the skill IDs it was computed from, so an
+    entry whose event or volunteer skills have changed is treated as a miss.
+    Writes invalidate only the entries they can affect: a volunteer change
+    drops the cached events that list the volunteer or share a skill with
+    their new profile, and an event change drops the cached volunteers that
+    list the event or share one of its skills.
+
+    Every invalidation bumps a generation counter. Callers read
+    ``generation()`` before computing a result and pass it to ``put_*``; a
+    result computed across an invalidation is then not stored, since it may
+    predate the write.
+    """
+
+    def __init__(self, max_entries=1024, vocabulary=None):
+        self.max_entries = max_entries
+        self.vocabulary = vocabulary or skill_vocabulary
+        self._events = OrderedDict()
+        self._volunteers = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def generation(self):
+        """Return the current generation, to pass to ``put_event``/``put_volunteer``."""
+        with self._lock:
+            return self._generation
+
+    def _skills(self, skills):
+        return self.vocabulary.ids(skills)
+
+    def _lookup(self, entries, key, skills, day=None):
+        with self._lock:
+            entry = entries.get(key)
+            if entry is None or entry['skills'] != skills or entry['day'] != day:
+                self.misses += 1
+                return None
+            entries.move_to_end(key)
+            self.hits += 1
+            return entry['results']
+
+    def _store(self, entries, key, entry, generation):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            entries[key] = entry
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def get_event(self, event, threshold=50, max_matches=5):
+        """Return cached volunteer matches for an event, or None on a miss."""
+        key = (event_key(event), threshold, max_matches)
+        return self._lookup(self._events, key, self._skills(event.get('requiredSkills')))
+
+    def put_event(self, event, results, threshold=50, max_matches=5, generation=None):
+        self._store(self._events, (event_key(event), threshold, max_matches), {
+            'skills': self._skills(event.get('requiredSkills')),
+            'day': None,
+            'results': results,
+            'members': {match['username'] for match in results}
+        }, generation)
+
+    def get_volunteer(self, user, day=None):
+        """Return cached event matches for a volunteer, or None on a miss."""
+        return self._lookup(self._volunteers, user['username'], self._skills(user.get('skills')), day or date.today())
+
+    def put_volunteer(self, user, results, day=None, generation=None):
+        self._store(self._volunteers, user['username'], {
+            'skills': self._skills(user.get('skills')),
+            'day': day or date.today(),
+            'results': results,
+            'members': {event_key(match['event']) for match in results}
+        }, generation)
+
+    def invalidate_volunteer(self, user):
+        """Drop the entries a volunteer's registration or profile edit can affect."""
+        username = user['username']
+        skills = self._skills(user.get('skills'))
+        with self._lock:
+            self._generation += 1
+            stale = [
+                key for key, entry in self._events.items()
+                if username in entry['members'] or entry['skills'] & skills
+            ]
+            for key in stale:
+                del self._events[key]
+            if self._volunteers.pop(username, None) is not None:
+                stale.append(username)
+            self.invalidations += len(stale)
+
+    def invalidate_event(self, event):
+        """Drop the entries a new or edited event can affect."""
+        key = event_key(event)
+        skills = self._skills(event.get('requiredSkills'))
+        with self._lock:
+            self._generation += 1
+            stale = [
+                username for username, entry in self._volunteers.items()
+                if key in entry['members'] or entry['skills'] & skills
+            ]
+            for username in stale:
+                del self._volunteers[username]
+            for cache_key in [cache_key for cache_key in self._events if cache_key[0] == key]:
+                del self._events[cache_key]
+                stale.append(cache_key)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._events) + len(self._volunteers)
+            self._events.clear()
+            self._volunteers.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the current number of entries."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'event_entries': len(self._events),
+                'volunteer_entries': len(self._volunteers)
+            }
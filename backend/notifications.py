@@ -0,0 +1,963 @@
+import base64
+import os
+import queue
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+# Columns of public.notifications (database/schema.sql)
+COLUMNS = ('id', 'username', 'message', 'type', 'relatedid', 'read', 'timestamp')
+
+_id_lock = threading.Lock()
+_last_id_ms = 0
+_id_sequence = 0
+
+def new_notification_id():
+    """Return a time-ordered UUID (version 7 layout).
+
+    IDs generated by this process sort in creation order, both as UUIDs and as
+    strings, which lets the store assign IDs before rows are written.
+    """
+    global _last_id_ms, _id_sequence
+    with _id_lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_id_ms:
+            _last_id_ms, _id_sequence = now_ms, 0
+        else:
+            _id_sequence += 1
+            if _id_sequence > 0xFFF:
+                _last_id_ms, _id_sequence = _last_id_ms + 1, 0
+        value = (
+            (_last_id_ms << 80) | (0x7 << 76) | (_id_sequence << 64)
+            | (0b10 << 62) | (int.from_bytes(os.urandom(8), 'big') >> 2)
+        )
+    return str(uuid.UUID(int=value))
+
+def parse_notification_id(value):
+    """Return a notification ID in canonical form; raises ValueError if it is not a UUID."""
+    if not isinstance(value, str):
+        raise ValueError(f'Invalid notification ID: {value!r}')
+    try:
+        return str(uuid.UUID(value))
+    except ValueError:
+        raise ValueError(f'Invalid notification ID: {value!r}') from None
+
+def normalize_timestamp(value):
+    """Render a timestamp as UTC ISO 8601 with microseconds, so strings sort in time order."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat(timespec='microseconds')
+
+def encode_cursor(notification):
+    """Return an opaque feed cursor for a notification's (timestamp, id) position."""
+    position = f"{notification['timestamp']}|{notification['id']}"
+    return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Return the (timestamp, id) position of a cursor; raises ValueError if malformed."""
+    try:
+        timestamp, notification_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return normalize_timestamp(timestamp), parse_notification_id(notification_id)
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def position(notification):
+    return (notification['timestamp'], notification['id'])
+
+def to_notification(row):
+    """Convert a notifications table row into the API representation."""
+    return {
+        'id': str(row['id']),
+        'message': row['message'],
+        'type': row['type'],
+        'timestamp': normalize_timestamp(row['timestamp']),
+        'read': bool(row['read']),
+        'related_id': row['relatedid']
+    }
+
+
+class SupabaseNotificationBackend:
+    """Notification rows stored in Supabase's notifications table."""
+
+    def __init__(self, client, table='notifications'):
+        self.client = client
+        self.table = table
+
+    def insert_many(self, rows):
+        self.client.table(self.table).insert(rows).execute()
+
+    def fetch(self, username):
+        response = (
+            self.client.table(self.table).select('*').eq('username', username)
+            .order('timestamp').order('id').execute()
+        )
+        return response.data or []
+
+    def page(self, username, limit, before=None, after=None, unread_only=False):
+        query = self.client.table(self.table).select('*').eq('username', username)
+        if unread_only:
+            query = query.eq('read', False)
+        if before is not None:
+            query = query.or_(f'timestamp.lt."{before[0]}",and(timestamp.eq."{before[0]}",id.lt."{before[1]}")')
+        if after is not None:
+            query = query.or_(f'timestamp.gt."{after[0]}",and(timestamp.eq."{after[0]}",id.gt."{after[1]}")')
+        # Rows just after the cursor are read oldest first, so nothing is skipped
+        descending = after is None
+        rows = query.order('timestamp', desc=descending).order('id', desc=descending).limit(limit).execute().data or []
+        return rows if descending else rows[::-1]
+
+    def expire(self, cutoff, read_cutoff, limit):
+        response = self.client.rpc('expire_notifications', {
+            'cutoff': cutoff,
+            'read_cutoff': read_cutoff,
+            'batch_size': limit
+        }).execute()
+        return [row['username'] for row in response.data or []]
+
+    def users_over(self, max_per_user):
+        response = self.client.rpc('notification_users_over', {'max_per_user': max_per_user}).execute()
+        return [row['username'] for row in response.data or []]
+
+    def trim(self, username, max_per_user, limit):
+        response = self.client.rpc('trim_notifications', {
+            'target_username': username,
+            'max_per_user': max_per_user,
+            'batch_size': limit
+        }).execute()
+        return [row['username'] for row in response.data or []]
+
+    def count_unread(self, username):
+        response = (
+            self.client.table(self.table).select('id', count='exact', head=True)
+            .eq('username', username).eq('read', False).execute()
+        )
+        return response.count or 0
+
+    def mark_read(self, username, ids=None, up_to=None):
+        query = self.client.table(self.table).update({'read': True}).eq('username', username).eq('read', False)
+        if ids is not None:
+            query = query.in_('id', list(ids))
+        if up_to is not None:
+            query = query.lte('id', up_to)
+        return len(query.execute().data or [])
+
+
+class SQLNotificationBackend:
+    """Notification rows stored through a DB-API connection.
+
+    Works with sqlite3 (``paramstyle='qmark'``) for local runs and tests, and
+    with a Postgres driver such as psycopg2 (``paramstyle='format'``). Pass
+    ``check_same_thread=False`` to sqlite3 when the store flushes on a timer,
+    and ``id_type='uuid'`` when the id column is a Postgres uuid, as in
+    database/schema.sql.
+
+    Notification IDs are time-ordered (``new_notification_id``), so "up to
+    ID X" is a plain ``id <=`` comparison.
+    """
+
+    def __init__(self, connection, paramstyle='qmark', table='notifications', id_type=None):
+        self.connection = connection
+        self.placeholder = '?' if paramstyle == 'qmark' else '%s'
+        self.table = table
+        self.id_type = id_type
+        self._lock = threading.Lock()
+
+    def create_table(self):
+        """Create the notifications table (for SQLite or scratch Postgres stand-ins)."""
+        self._execute(
+            f'create table if not exists {self.table} ('
+            'id text primary key, username text, message text not null, type text not null, '
+            'relatedid text, read boolean default false, timestamp text not null)'
+        )
+
+    def _execute(self, sql, params=(), many=False):
+        with self._lock:
+            cursor = self.connection.cursor()
+            try:
+                if many:
+                    cursor.executemany(sql, params)
+                else:
+                    cursor.execute(sql, params)
+                rows = cursor.fetchall() if cursor.description else None
+                columns = [column[0].lower() for column in cursor.description] if cursor.description else None
+                rowcount = cursor.rowcount
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+            finally:
+                cursor.close()
+        # Row dicts for queries, the number of affected rows for other statements
+        return [dict(zip(columns, row)) for row in rows] if rows is not None else rowcount
+
+    def insert_many(self, rows):
+        placeholders = ', '.join([self.placeholder] * len(COLUMNS))
+        self._execute(
+            f'insert into {self.table} ({", ".join(COLUMNS)}) values ({placeholders})',
+            [tuple(row[column] for column in COLUMNS) for row in rows],
+            many=True
+        )
+
+    def fetch(self, username):
+        return self._execute(
+            f'select {", ".join(COLUMNS)} from {self.table} where username = {self.placeholder} '
+            'order by timestamp, id',
+            (username,)
+        )
+
+    def page(self, username, limit, before=None, after=None, unread_only=False):
+        p = self.placeholder
+        sql = f'select {", ".join(COLUMNS)} from {self.table} where username = {p}'
+        params = [username]
+        if unread_only:
+            sql += f' and read = {p}'
+            params.append(False)
+        if before is not None:
+            sql += f' and (timestamp < {p} or (timestamp = {p} and id < {p}))'
+            params.extend([before[0], before[0], before[1]])
+        if after is not None:
+            sql += f' and (timestamp > {p} or (timestamp = {p} and id > {p}))'
+            params.extend([after[0], after[0], after[1]])
+        # Rows just after the cursor are read oldest first, so nothing is skipped
+        order = 'desc' if after is None else 'asc'
+        sql += f' order by timestamp {order}, id {order} limit {p}'
+        params.append(limit)
+        rows = self._execute(sql, params)
+        return rows if after is None else rows[::-1]
+
+    def expire(self, cutoff, read_cutoff, limit):
+        p = self.placeholder
+        expired, params = [], []
+        if cutoff is not None:
+            expired.append(f'timestamp < {p}')
+            params.append(cutoff)
+        if read_cutoff is not None:
+            expired.append(f'(read = {p} and timestamp < {p})')
+            params.extend([True, read_cutoff])
+        if not expired:
+            return []
+        # The later cutoff bounds a range scan of the timestamp index
+        latest = max(value for value in (cutoff, read_cutoff) if value is not None)
+        rows = self._execute(
+            f'delete from {self.table} where id in (select id from {self.table} '
+            f'where timestamp < {p} and ({" or ".join(expired)}) limit {p}) returning username',
+            [latest] + params + [limit]
+        )
+        return [row['username'] for row in rows]
+
+    def users_over(self, max_per_user):
+        rows = self._execute(
+            f'select username from {self.table} group by username having count(*) > {self.placeholder}',
+            (max_per_user,)
+        )
+        return [row['username'] for row in rows]
+
+    def trim(self, username, max_per_user, limit):
+        p = self.placeholder
+        # Walks the (username, timestamp desc, id desc) index past the newest max_per_user rows
+        rows = self._execute(
+            f'delete from {self.table} where id in (select id from {self.table} where username = {p} '
+            f'order by timestamp desc, id desc limit {p} offset {p}) returning username',
+            (username, limit, max_per_user)
+        )
+        return [row['username'] for row in rows]
+
+    def count_unread(self, username):
+        rows = self._execute(
+            f'select count(*) as unread from {self.table} '
+            f'where username = {self.placeholder} and read = {self.placeholder}',
+            (username, False)
+        )
+        return rows[0]['unread']
+
+    def mark_read(self, username, ids=None, up_to=None):
+        p = self.placeholder
+        sql = f'update {self.table} set read = {p} where username = {p} and read = {p}'
+        params = [True, username, False]
+        if ids is not None:
+            ids = list(ids)
+            if p == '%s':
+                sql += f' and id = any(%s::{self.id_type}[])' if self.id_type else ' and id = any(%s)'
+                params.append(ids)
+            else:
+                sql += f' and id in ({", ".join([p] * len(ids))})'
+                params.extend(ids)
+        if up_to is not None:
+            sql += f' and id <= {p}'
+            params.append(up_to)
+        return self._execute(sql, params)
+
+
+class Subscription:
+    """One stream subscriber's bounded queue of new notifications."""
+
+    def __init__(self, username, queue_size):
+        self.username = username
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    @property
+    def closed(self):
+        """True once the subscriber fell behind and every queued item was read."""
+        return self.overflowed and self.queue.empty()
+
+    def get(self, timeout=None):
+        """Return the next notification, or None if none arrives within ``timeout``."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class NotificationHub:
+    """In-process pub/sub for new notifications, keyed by username.
+
+    Each subscriber gets a queue of at most ``queue_size`` notifications.
+    Publishing never blocks: a subscriber whose queue is full is marked as
+    overflowed and dropped from the hub, and is expected to reconnect and
+    catch up from the store (e.g. with ``Last-Event-ID``).
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, username):
+        subscription = Subscription(username, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(username, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.username)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.username]
+
+    def subscriber_count(self, username=None):
+        with self._lock:
+            if username is not None:
+                return len(self._subscribers.get(username, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, username, notification):
+        """Queue a notification for the user's subscribers."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(username, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(dict(notification))
+            except queue.Full:
+                subscription.overflowed = True
+                self.unsubscribe(subscription)
+
+
+class NotificationWriteError(Exception):
+    """Raised when pending notifications could not be written; they stay queued for a retry."""
+
+
+class NotificationStore:
+    """Persistent notifications with buffered writes and a per-user read cache.
+
+    New notifications are buffered and written in multi-row inserts once
+    ``batch_size`` rows are pending or ``flush_interval`` seconds have passed
+    (``flush_interval=None`` leaves flushing to size and explicit ``flush``
+    calls). Batches from ``create_many`` and ``create_batch`` skip the buffer and are written in
+    chunks of ``batch_size`` rows, at most ``workers`` chunks at a time
+    (default: the NOTIFICATION_WORKERS environment variable, or 4). New
+    notifications are published to ``hub``, when one is given. Reads are
+    served from a per-user cache that is loaded from the backend on a miss,
+    kept current by writes made through the store and reloaded after
+    ``cache_ttl`` seconds, so rows written by other processes show up.
+    Unread counters expire after the same time.
+
+    When a batch insert fails its rows are retried one by one, so a row the
+    database rejects cannot hold back the rest. Rows that still fail stay
+    queued and are dropped after ``max_attempts`` failed writes. After a
+    flush that writes nothing, further flushes back off (doubling from
+    ``flush_interval`` up to a minute) unless forced.
+
+    With a ``dedupe_window`` (seconds), a notification with the same
+    ``(username, type, related_id)`` as one created within the window is
+    dropped before it is buffered, written or published. Notifications
+    without a related_id are never deduplicated.
+    """
+
+    def __init__(self, backend, batch_size=100, flush_interval=1.0, max_cached_users=10000, workers=None,
+                 hub=None, dedupe_window=None, cache_ttl=30.0, max_attempts=5, clock=time.monotonic):
+        self.backend = backend
+        self.cache_ttl = cache_ttl
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self._attempts = {}
+        self._dropped = 0
+        self._backoff = 0
+        self._retry_at = None
+        self.hub = hub
+        self.dedupe_window = dedupe_window
+        self._recent = OrderedDict()
+        self._deduplicated = 0
+        self._coalesced = 0
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_cached_users = max_cached_users
+        self.workers = workers or int(os.getenv('NOTIFICATION_WORKERS', 4))
+        self._executor = None
+        self._latencies = deque(maxlen=1000)
+        self._batches = 0
+        self._rows_written = 0
+        self._failed_batches = 0
+        self._pending = []
+        self._cache = OrderedDict()
+        self._unread = OrderedDict()
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = None
+
+    def _start_flusher(self):
+        if self.flush_interval is None or self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_periodically, name='notification-flusher', daemon=True
+                )
+                self._flusher.start()
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print("Error flushing notifications:", e)
+
+    def _expiry(self):
+        return self.clock() + self.cache_ttl if self.cache_ttl is not None else float('inf')
+
+    def _cached(self, username):
+        entry = self._cache.get(username)
+        if entry is None:
+            return None
+        expires, notifications = entry
+        if expires <= self.clock():
+            del self._cache[username]
+            return None
+        self._cache.move_to_end(username)
+        return notifications
+
+    def _remember(self, username, notifications):
+        self._cache[username] = (self._expiry(), notifications)
+        self._cache.move_to_end(username)
+        while len(self._cache) > self.max_cached_users:
+            self._cache.popitem(last=False)
+        self._remember_unread(username, sum(not notification['read'] for notification in notifications))
+
+    def _cached_unread(self, username):
+        entry = self._unread.get(username)
+        if entry is None:
+            return None
+        if entry[0] <= self.clock():
+            del self._unread[username]
+            return None
+        self._unread.move_to_end(username)
+        return entry[1]
+
+    def _adjust_unread(self, username, delta):
+        entry = self._unread.get(username)
+        if entry is not None:
+            entry[1] = max(entry[1] + delta, 0)
+
+    def _remember_unread(self, username, count):
+        self._unread[username] = [self._expiry(), count]
+        self._unread.move_to_end(username)
+        while len(self._unread) > self.max_cached_users:
+            self._unread.popitem(last=False)
+
+    def _new_row(self, username, message, notification_type, related_id):
+        return {
+            'id': new_notification_id(),
+            'username': username,
+            'message': message,
+            'type': notification_type,
+            'relatedid': related_id,
+            'read': False,
+            'timestamp': normalize_timestamp(datetime.now(timezone.utc))
+        }
+
+    def _forget(self, username):
+        self._cache.pop(username, None)
+        self._unread.pop(username, None)
+
+    def _insert(self, rows):
+        """Write one batch of rows, recording its latency."""
+        started = time.perf_counter()
+        try:
+            self.backend.insert_many(rows)
+        except Exception:
+            with self._lock:
+                self._failed_batches += 1
+            raise
+        with self._lock:
+            self._latencies.append(time.perf_counter() - started)
+            self._batches += 1
+            self._rows_written += len(rows)
+
+    def _write(self, rows):
+        """Write rows, isolating the ones the backend rejects.
+
+        Returns the rows to retry later. Rows that have now failed
+        ``max_attempts`` times are dropped, and their users' caches forgotten
+        so the next read reflects what was actually stored.
+        """
+        failed, error = [], None
+        try:
+            self._insert(rows)
+        except Exception as e:
+            failed, error = list(rows), e
+            if len(rows) > 1:
+                # Retry row by row so a row the database rejects does not hold back the batch
+                failed = []
+                for row in rows:
+                    try:
+                        self.backend.insert_many([row])
+                    except Exception as row_error:
+                        failed.append(row)
+                        error = row_error
+                    else:
+                        with self._lock:
+                            self._rows_written += 1
+        failed_ids = {row['id'] for row in failed}
+        with self._lock:
+            for row in rows:
+                if row['id'] not in failed_ids:
+                    self._attempts.pop(row['id'], None)
+            retry = []
+            for row in failed:
+                attempts = self._attempts.get(row['id'], 0) + 1
+                if attempts < self.max_attempts:
+                    self._attempts[row['id']] = attempts
+                    retry.append(row)
+                    continue
+                self._attempts.pop(row['id'], None)
+                self._dropped += 1
+                self._forget(row['username'])
+                print(f"Dropping notification {row['id']} for {row['username']} after {attempts} failed writes:", error)
+        return retry
+
+    def _is_duplicate(self, username, notification_type, related_id):
+        """Check and record a notification's key against the dedupe window (call with the lock held)."""
+        if self.dedupe_window is None or related_id is None:
+            return False
+        now = self.clock()
+        while self._recent:
+            oldest, created_at = next(iter(self._recent.items()))
+            if now - created_at < self.dedupe_window:
+                break
+            del self._recent[oldest]
+        key = (username, notification_type, related_id)
+        if key in self._recent:
+            self._deduplicated += 1
+            return True
+        self._recent[key] = now
+        return False
+
+    def create(self, username, message, notification_type, related_id=None):
+        """Create a notification and queue it for the next batch insert.
+
+        Returns the notification, or None if it duplicates a recent one.
+        """
+        row = self._new_row(username, message, notification_type, related_id)
+        notification = to_notification(row)
+        with self._lock:
+            if self._is_duplicate(username, notification_type, related_id):
+                return None
+            self._pending.append(row)
+            cached = self._cached(username)
+            if cached is not None:
+                insort(cached, notification, key=position)
+            self._adjust_unread(username, 1)
+            flush_now = len(self._pending) >= self.batch_size
+        self._start_flusher()
+        if flush_now:
+            self._flush_quietly()
+        if self.hub is not None:
+            self.hub.publish(username, notification)
+        return dict(notification)
+
+    def flush(self, force=False):
+        """Write all pending notifications in one multi-row insert; returns how many were written.
+
+        Raises NotificationWriteError if some rows could not be written; they
+        stay queued. While backing off after a failed flush, nothing is
+        attempted unless ``force`` is set.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not force and self._retry_at is not None and self.clock() < self._retry_at:
+                    return 0
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            retry = self._write(rows)
+            with self._lock:
+                # Keep the failed rows so the next flush retries them
+                self._pending[:0] = retry
+                if not retry:
+                    self._backoff, self._retry_at = 0, None
+                elif len(retry) == len(rows):
+                    self._backoff = min(max(self._backoff * 2, self.flush_interval or 1.0), 60.0)
+                    self._retry_at = self.clock() + self._backoff
+            if retry:
+                raise NotificationWriteError(f'{len(retry)} of {len(rows)} notifications could not be written')
+            return len(rows)
+
+    def _flush_quietly(self):
+        """Flush before a read or after a full batch, logging rather than raising failures."""
+        try:
+            self.flush()
+        except NotificationWriteError as e:
+            print("Error flushing notifications:", e)
+
+    def create_many(self, usernames, template, notification_type, related_id=None, context=None):
+        """Send one notification to each of ``usernames``.
+
+        ``template`` is rendered per user with ``str.format`` fields taken from
+        ``context`` plus ``username``. Returns the created notifications.
+        """
+        context = dict(context or {})
+        return self.create_batch([
+            {
+                'username': username,
+                'message': template.format_map({**context, 'username': username}),
+                'type': notification_type,
+                'related_id': related_id
+            }
+            for username in usernames
+        ])
+
+    def create_batch(self, entries, coalesce=None):
+        """Create notifications from ``username``/``message``/``type``/``related_id`` dicts.
+
+        Duplicates are dropped first. With ``coalesce``, each user's remaining
+        entries of one type are passed, when there is more than one, to
+        ``coalesce(entries)``, which returns the ``(message, related_id)`` of
+        the single notification that replaces them. Rows are written in
+        multi-row inserts of ``batch_size``; the rows of a chunk that fails
+        are retried one by one, and those still failing are queued for the
+        next flush. Returns the created notifications.
+        """
+        with self._lock:
+            entries = [
+                entry for entry in entries
+                if not self._is_duplicate(entry['username'], entry['type'], entry.get('related_id'))
+            ]
+        if coalesce is not None:
+            groups = OrderedDict()
+            for entry in entries:
+                groups.setdefault((entry['username'], entry['type']), []).append(entry)
+            entries = []
+            for (username, notification_type), group in groups.items():
+                if len(group) == 1:
+                    entries.append(group[0])
+                    continue
+                message, related_id = coalesce(group)
+                entries.append({'username': username, 'message': message, 'type': notification_type,
+                                'related_id': related_id})
+                with self._lock:
+                    self._coalesced += len(group) - 1
+
+        rows = [
+            self._new_row(entry['username'], entry['message'], entry['type'], entry.get('related_id'))
+            for entry in entries
+        ]
+        notifications = [to_notification(row) for row in rows]
+        with self._lock:
+            for row, notification in zip(rows, notifications):
+                cached = self._cached(row['username'])
+                if cached is not None:
+                    insort(cached, notification, key=position)
+                self._adjust_unread(row['username'], 1)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='notification-fanout')
+
+        chunks = [rows[start:start + self.batch_size] for start in range(0, len(rows), self.batch_size)]
+        futures = [self._executor.submit(self._write, chunk) for chunk in chunks]
+        for future in futures:
+            retry = future.result()
+            if retry:
+                with self._lock:
+                    self._pending.extend(retry)
+                self._start_flusher()
+        if self.hub is not None:
+            for notification, row in zip(notifications, rows):
+                self.hub.publish(row['username'], notification)
+        return [dict(notification) for notification in notifications]
+
+    def stats(self):
+        """Report batch write counts and per-batch latency in milliseconds."""
+        with self._lock:
+            last = self._latencies[-1] if self._latencies else None
+            latencies = sorted(self._latencies)
+            pending = len(self._pending)
+            batches, rows, failed = self._batches, self._rows_written, self._failed_batches
+            deduplicated, coalesced, dropped = self._deduplicated, self._coalesced, self._dropped
+        latency = {'last': None, 'mean': None, 'p95': None, 'max': None}
+        if latencies:
+            latency = {
+                'last': last * 1000,
+                'mean': sum(latencies) / len(latencies) * 1000,
+                'p95': latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000,
+                'max': latencies[-1] * 1000
+            }
+        return {
+            'batches': batches,
+            'rows_written': rows,
+            'failed_batches': failed,
+            'pending': pending,
+            'dropped': dropped,
+            'deduplicated': deduplicated,
+            'coalesced': coalesced,
+            'batch_latency_ms': latency
+        }
+
+    def get(self, username):
+        """Return all of a user's notifications, oldest first."""
+        with self._lock:
+            cached = self._cached(username)
+            if cached is not None:
+                return [dict(notification) for notification in cached]
+        # Pending rows must reach the backend before it is read
+        self._flush_quietly()
+        notifications = [to_notification(row) for row in self.backend.fetch(username)]
+        with self._lock:
+            # Rows created for this user while the backend was being read
+            stored = {notification['id'] for notification in notifications}
+            notifications += [
+                to_notification(row) for row in self._pending
+                if row['username'] == username and row['id'] not in stored
+            ]
+            notifications.sort(key=position)
+            self._remember(username, notifications)
+        return [dict(notification) for notification in notifications]
+
+    def page(self, username, limit=50, before=None, after=None, unread_only=False):
+        """Return up to ``limit`` notifications, newest first.
+
+        ``before`` and ``after`` are ``(timestamp, id)`` positions (see
+        ``decode_cursor``): ``before`` pages back through older notifications
+        and ``after`` returns the ones closest after a position, so a client can
+        fetch only what is new since its last cursor. Cached users are paged in
+        memory; otherwise the page is a keyset query on the backend.
+        """
+        with self._lock:
+            cached = self._cached(username)
+            if cached is not None:
+                start = bisect_right(cached, after, key=position) if after is not None else 0
+                end = bisect_left(cached, before, key=position) if before is not None else len(cached)
+                window = cached[start:end]
+                if after is None:
+                    window = reversed(window)
+                notifications = []
+                for notification in window:
+                    if unread_only and notification['read']:
+                        continue
+                    notifications.append(dict(notification))
+                    if len(notifications) == limit:
+                        break
+                return notifications if after is None else notifications[::-1]
+        # Pending rows must reach the backend before it is read
+        self._flush_quietly()
+        rows = self.backend.page(username, limit, before=before, after=after, unread_only=unread_only)
+        return [to_notification(row) for row in rows]
+
+    def unread_count(self, username):
+        """Return how many of a user's notifications are unread."""
+        with self._lock:
+            count = self._cached_unread(username)
+            if count is not None:
+                return count
+        # Pending rows must reach the backend before it is counted
+        self._flush_quietly()
+        count = self.backend.count_unread(username)
+        with self._lock:
+            # Rows created for this user while the backend was being counted
+            count += sum(row['username'] == username and not row.get('read') for row in self._pending)
+            self._remember_unread(username, count)
+        return count
+
+    def mark_read(self, username, notification_ids=None, up_to=None, mark_all=False):
+        """Mark a user's notifications as read in one update.
+
+        Marks the notifications in ``notification_ids``, those up to and
+        including the ID ``up_to``, or every notification when ``mark_all``
+        is set. Returns how many unread notifications changed.
+        """
+        if not mark_all and notification_ids is None and up_to is None:
+            return 0
+        ids = None if mark_all or notification_ids is None else set(notification_ids)
+        if ids is not None and not ids:
+            return 0
+        up_to = None if mark_all or up_to is None else str(up_to).lower()
+        # Pending rows must reach the backend before they can be updated
+        self._flush_quietly()
+        changed = self.backend.mark_read(username, ids=ids, up_to=up_to)
+        with self._lock:
+            # Rows that could not be written yet are marked before they are
+            for row in self._pending:
+                if row['username'] != username or row['read']:
+                    continue
+                if ids is not None and row['id'] not in ids:
+                    continue
+                if up_to is not None and row['id'] > up_to:
+                    continue
+                row['read'] = True
+                changed += 1
+            for notification in self._cached(username) or []:
+                if ids is not None and notification['id'] not in ids:
+                    continue
+                if up_to is not None and notification['id'] > up_to:
+                    continue
+                notification['read'] = True
+            self._adjust_unread(username, -changed)
+        return changed
+
+    def _reclaimed(self, usernames):
+        """Drop the users whose rows were deleted from the caches; returns how many rows were deleted."""
+        with self._lock:
+            for username in set(usernames):
+                self._forget(username)
+        return len(usernames)
+
+    def expire(self, cutoff=None, read_cutoff=None, limit=1000):
+        """Delete up to ``limit`` notifications older than ``cutoff``, or read and older than ``read_cutoff``.
+
+        Returns how many were deleted. Affected users are dropped from the
+        caches and reloaded on their next read.
+        """
+        return self._reclaimed(self.backend.expire(
+            normalize_timestamp(cutoff) if cutoff is not None else None,
+            normalize_timestamp(read_cutoff) if read_cutoff is not None else None,
+            limit
+        ))
+
+    def users_over(self, max_per_user):
+        """Return the users with more than ``max_per_user`` stored notifications."""
+        return self.backend.users_over(max_per_user)
+
+    def trim(self, username, max_per_user, limit=1000):
+        """Delete up to ``limit`` of a user's notifications beyond their newest ``max_per_user``."""
+        return self._reclaimed(self.backend.trim(username, max_per_user, limit))
+
+    def close(self):
+        """Stop the flush timer and fan-out workers and write anything still pending."""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        try:
+            self.flush(force=True)
+        except NotificationWriteError as e:
+            print("Error flushing notifications:", e)
+
+
+class NotificationCompactor:
+    """Background retention job for the notifications table.
+
+    Each run deletes notifications older than ``max_age``, read ones older
+    than ``read_max_age`` and those beyond the newest ``max_per_user`` of each
+    user (any limit may be None). Rows are deleted ``batch_size`` at a time,
+    pausing ``pause`` seconds between batches, so no single statement holds
+    locks for long. Expired rows go first; the users over the cap are then
+    looked up once per run and trimmed one at a time, so no batch has to
+    rank the whole table. The job runs every ``interval`` seconds once
+    started.
+    """
+
+    def __init__(self, store, max_age=timedelta(days=90), read_max_age=timedelta(days=30), max_per_user=500,
+                 batch_size=500, interval=3600, pause=0.1):
+        self.store = store
+        self.max_age = max_age
+        self.read_max_age = read_max_age
+        self.max_per_user = max_per_user
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._last_run = None
+        self._last_reclaimed = 0
+        self._total_reclaimed = 0
+
+    def run_once(self):
+        """Run one compaction pass; returns the number of rows reclaimed."""
+        now = datetime.now(timezone.utc)
+        cutoff = now - self.max_age if self.max_age is not None else None
+        read_cutoff = now - self.read_max_age if self.read_max_age is not None else None
+        reclaimed = self._drain(lambda: self.store.expire(cutoff, read_cutoff, self.batch_size))
+        if self.max_per_user is not None and not self._stop.is_set():
+            for username in self.store.users_over(self.max_per_user):
+                reclaimed += self._drain(lambda: self.store.trim(username, self.max_per_user, self.batch_size))
+                if self._stop.is_set():
+                    break
+        with self._lock:
+            self._runs += 1
+            self._last_run = now.isoformat()
+            self._last_reclaimed = reclaimed
+            self._total_reclaimed += reclaimed
+        return reclaimed
+
+    def _drain(self, delete_batch):
+        """Run ``delete_batch`` until it deletes less than a full batch; returns the rows deleted."""
+        reclaimed = 0
+        while True:
+            deleted = delete_batch()
+            reclaimed += deleted
+            if deleted < self.batch_size or self._stop.wait(self.pause):
+                return reclaimed
+
+    def stats(self):
+        """Report runs and rows reclaimed."""
+        with self._lock:
+            return {
+                'runs': self._runs,
+                'last_run': self._last_run,
+                'last_reclaimed': self._last_reclaimed,
+                'total_reclaimed': self._total_reclaimed
+            }
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print("Error compacting notifications:", e)
+
+    def start(self):
+        """Run compaction every ``interval`` seconds in a background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='notification-compactor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
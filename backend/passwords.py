@@ -0,0 +1,217 @@
+import argparse
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing queue is full."""
+
+
+DEFAULT_ROUNDS = 12
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+
+
+class PasswordHasher:
+    """bcrypt hashing and verification on a dedicated, bounded thread pool.
+
+    bcrypt releases the GIL, so ``workers`` threads (default: the
+    PASSWORD_WORKERS environment variable, or the CPU count) hash in parallel
+    without tying up more request threads than there are cores. At most
+    ``max_queue`` further calls (default: PASSWORD_QUEUE, or 4 per worker) may
+    wait for a worker; beyond that calls fail immediately with
+    ``PasswordHasherBusy`` instead of piling up.
+
+    New hashes use ``rounds`` as the bcrypt cost (default: BCRYPT_ROUNDS, or
+    12). Hashes made at any other cost are migrated by
+    ``rehash_in_background`` the next time their password is verified.
+    """
+
+    def __init__(self, workers=None, max_queue=None, rounds=None):
+        self.workers = workers or int(os.getenv('PASSWORD_WORKERS', os.cpu_count() or 1))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv('PASSWORD_QUEUE', self.workers * 4))
+        self.rounds = rounds or int(os.getenv('BCRYPT_ROUNDS', DEFAULT_ROUNDS))
+        if not MIN_ROUNDS <= self.rounds <= MAX_ROUNDS:
+            raise ValueError(f'bcrypt rounds must be between {MIN_ROUNDS} and {MAX_ROUNDS}')
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hasher')
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+        self._rehashed = 0
+        self._rehashing = set()
+        self._waits = deque(maxlen=1000)
+
+    def _run(self, queued_at, function, *args):
+        with self._lock:
+            self._active += 1
+            self._waits.append(time.perf_counter() - queued_at)
+        try:
+            return function(*args)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._in_flight -= 1
+                self._completed += 1
+
+    def submit_nowait(self, function, *args):
+        """Queue ``function(*args)`` on the pool and return its future."""
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise PasswordHasherBusy('Password hashing queue is full')
+            self._in_flight += 1
+        try:
+            return self._executor.submit(self._run, time.perf_counter(), function, *args)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+
+    def submit(self, function, *args):
+        """Run ``function(*args)`` on the pool and wait for its result."""
+        return self.submit_nowait(function, *args).result()
+
+    def hash_password(self, password):
+        """Hash a password using bcrypt."""
+        return self.submit(_hash, password, self.rounds)
+
+    def verify_password(self, password, hashed_password):
+        """Verify a password against a bcrypt hash."""
+        return self.submit(_verify, password, hashed_password)
+
+    def needs_rehash(self, hashed_password):
+        """Whether a bcrypt hash was made at a cost other than ``rounds``."""
+        cost = hash_rounds(hashed_password)
+        return cost is not None and cost != self.rounds
+
+    def rehash_in_background(self, password, hashed_password, save):
+        """Rehash a just-verified password whose hash has an outdated cost.
+
+        The new hash is passed to ``save`` on a pool thread; the caller does not
+        wait. Returns the future, or None when no rehash is needed, one for the
+        same hash is already running, or the pool is busy (the next login
+        retries).
+        """
+        if not self.needs_rehash(hashed_password):
+            return None
+        with self._lock:
+            if hashed_password in self._rehashing:
+                return None
+            self._rehashing.add(hashed_password)
+        try:
+            return self.submit_nowait(self._rehash, password, hashed_password, save)
+        except PasswordHasherBusy:
+            with self._lock:
+                self._rehashing.discard(hashed_password)
+            return None
+
+    def _rehash(self, password, hashed_password, save):
+        try:
+            save(_hash(password, self.rounds))
+            with self._lock:
+                self._rehashed += 1
+        except Exception as e:
+            print("Error rehashing password:", e)
+        finally:
+            with self._lock:
+                self._rehashing.discard(hashed_password)
+
+    def stats(self):
+        """Report pool size, queue depth and time spent waiting for a worker."""
+        with self._lock:
+            waits = sorted(self._waits)
+            stats = {
+                'rounds': self.rounds,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'active': self._active,
+                'queued': self._in_flight - self._active,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'rehashed': self._rehashed
+            }
+        stats['queue_wait_ms'] = {
+            'mean': sum(waits) / len(waits) * 1000 if waits else None,
+            'p95': waits[min(int(len(waits) * 0.95), len(waits) - 1)] * 1000 if waits else None
+        }
+        return stats
+
+
+def hash_rounds(hashed_password):
+    """The cost encoded in a bcrypt hash (``$2b$12$...``), or None if unparseable."""
+    if isinstance(hashed_password, bytes):
+        hashed_password = hashed_password.decode('utf-8', 'replace')
+    parts = (hashed_password or '').split('$')
+    if len(parts) < 4 or not parts[1].startswith('2') or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+def _hash(password, rounds=DEFAULT_ROUNDS):
+    if isinstance(password, str):
+        password = password.encode('utf-8')
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _verify(password, hashed_password):
+    if isinstance(password, str):
+        password = password.encode('utf-8')
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode('utf-8')
+    return bcrypt.checkpw(password, hashed_password)
+
+
+# Shared by app.py and supabaseClient.py
+password_hasher = PasswordHasher()
+
+def hash_password(password):
+    """Hash a password using bcrypt on the shared hashing pool."""
+    return password_hasher.hash_password(password)
+
+def verify_password(password, hashed_password):
+    """Verify a password against a bcrypt hash on the shared hashing pool."""
+    return password_hasher.verify_password(password, hashed_password)
+
+def rehash_in_background(password, hashed_password, save):
+    """Migrate an outdated hash to the configured cost on the shared hashing pool."""
+    return password_hasher.rehash_in_background(password, hashed_password, save)
+
+
+def calibrate(target_ms, min_rounds=MIN_ROUNDS, max_rounds=20, samples=3):
+    """Return the highest bcrypt cost whose verification fits in ``target_ms``.
+
+    Each step doubles the work, so timing stops at the first cost over the
+    target. Returns ``(rounds, timings)`` where ``timings`` maps each cost
+    tried to its median verification time in milliseconds.
+    """
+    rounds = min_rounds
+    timings = {}
+    for cost in range(min_rounds, max_rounds + 1):
+        hashed = _hash('calibration-password', cost)
+        runs = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            _verify('calibration-password', hashed)
+            runs.append((time.perf_counter() - started) * 1000)
+        timings[cost] = sorted(runs)[len(runs) // 2]
+        if timings[cost] > target_ms:
+            break
+        rounds = cost
+    return rounds, timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pick a bcrypt cost for a target verification latency.')
+    parser.add_argument('--target-ms', type=float, default=250, help='verification latency budget per password')
+    parser.add_argument('--max-rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    rounds, timings = calibrate(args.target_ms, max_rounds=args.max_rounds)
+    for cost, elapsed in timings.items():
+        print(f'cost {cost:2d}: {elapsed:8.1f} ms')
+    print(f'BCRYPT_ROUNDS={rounds}')
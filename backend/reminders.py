@@ -0,0 +1,311 @@
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+from matching import event_key, parse_event_date
+
+
+class EventCalendar:
+    """Events kept in date order for range lookups.
+
+    Dates and keys live in parallel lists sorted by date, so the events in a
+    window are found with two bisections and the cost of a lookup grows with
+    the number of events in the window rather than with the catalog. Events
+    without a parseable ``eventDate`` are left out.
+    """
+
+    def __init__(self):
+        self._dates = []
+        self._keys = []
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._events)
+
+    def __contains__(self, key):
+        return key in self._events
+
+    def build(self, events):
+        """Replace the calendar's contents with ``events``."""
+        entries = []
+        for event in events:
+            event_date = parse_event_date(event.get('eventDate'))
+            if event_date is not None:
+                entries.append((event_date, event_key(event), event))
+        entries.sort(key=lambda entry: entry[0])
+        with self._lock:
+            self._dates = [entry[0] for entry in entries]
+            self._keys = [entry[1] for entry in entries]
+            self._events = {key: (event_date, event) for event_date, key, event in entries}
+
+    def _remove(self, key):
+        entry = self._events.pop(key, None)
+        if entry is None:
+            return
+        start = bisect_left(self._dates, entry[0])
+        end = bisect_right(self._dates, entry[0])
+        position = self._keys.index(key, start, end)
+        del self._dates[position]
+        del self._keys[position]
+
+    def add(self, event):
+        """Add an event, or move it if its date changed."""
+        key = event_key(event)
+        event_date = parse_event_date(event.get('eventDate'))
+        with self._lock:
+            self._remove(key)
+            if event_date is None:
+                return
+            position = bisect_right(self._dates, event_date)
+            self._dates.insert(position, event_date)
+            self._keys.insert(position, key)
+            self._events[key] = (event_date, event)
+
+    def remove(self, key):
+        """Remove an event by its key."""
+        with self._lock:
+            self._remove(key)
+
+    def between(self, start, end):
+        """Return the events dated within ``[start, end]``, earliest first."""
+        with self._lock:
+            keys = self._keys[bisect_left(self._dates, start):bisect_right(self._dates, end)]
+            return [self._events[key][1] for key in keys]
+
+
+class SupabaseReminderLog:
+    """Sent reminders recorded in Supabase's sentReminders table."""
+
+    def __init__(self, client, table='sentreminders'):
+        self.client = client
+        self.table = table
+
+    def sent(self, since=None):
+        query = self.client.table(self.table).select('eventid, eventdate')
+        if since is not None:
+            query = query.gte('eventdate', since)
+        return {(row['eventid'], row['eventdate']) for row in query.execute().data or []}
+
+    def record(self, event_id, event_date):
+        self.client.table(self.table).upsert({'eventid': event_id, 'eventdate': event_date}).execute()
+
+
+class SQLReminderLog:
+    """Sent reminders recorded through a DB-API connection (sqlite3 or psycopg2)."""
+
+    def __init__(self, connection, paramstyle='qmark', table='sentreminders'):
+        self.connection = connection
+        self.placeholder = '?' if paramstyle == 'qmark' else '%s'
+        self.table = table
+        self._lock = threading.Lock()
+
+    def create_table(self):
+        """Create the sent reminders table (for SQLite or scratch Postgres stand-ins)."""
+        with self._lock:
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute(
+                    f'create table if not exists {self.table} ('
+                    'eventid text not null, eventdate text not null, primary key (eventid, eventdate))'
+                )
+                self.connection.commit()
+            finally:
+                cursor.close()
+
+    def sent(self, since=None):
+        with self._lock:
+            cursor = self.connection.cursor()
+            try:
+                if since is None:
+                    cursor.execute(f'select eventid, eventdate from {self.table}')
+                else:
+                    cursor.execute(
+                        f'select eventid, eventdate from {self.table} where eventdate >= {self.placeholder}', (since,)
+                    )
+                return {(row[0], row[1]) for row in cursor.fetchall()}
+            finally:
+                cursor.close()
+
+    def record(self, event_id, event_date):
+        with self._lock:
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute(
+                    f'insert into {self.table} (eventid, eventdate) '
+                    f'values ({self.placeholder}, {self.placeholder}) on conflict do nothing',
+                    (event_id, event_date)
+                )
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+
+class ReminderScheduler:
+    """Fire one reminder per event, ``lead`` ahead of its date.
+
+    Jobs are ``(fire_time, event_id)`` entries in a min-heap, (re)computed
+    whenever an event is scheduled. A background thread sleeps until the
+    earliest deadline, or until an earlier job is scheduled, then passes the
+    due events to ``send`` together, so reminders that fall due at the same
+    time can be coalesced. Rescheduling an event leaves its old heap entry in
+    place; entries whose time no longer matches the event's current job are
+    skipped when they come up.
+
+    Progress is kept in ``log`` as ``(event_id, event date)`` pairs recorded
+    after ``send`` returns, and loaded on ``start``, so a restarted scheduler
+    skips reminders already sent and fires any that came due while it was
+    down. Only entries for events dated today or later are loaded, since
+    earlier events are never scheduled. An event whose date changes gets a
+    new reminder for the new date.
+    """
+
+    def __init__(self, send, log=None, lead=timedelta(days=1), clock=datetime.now):
+        self.send = send
+        self.log = log
+        self.lead = lead
+        self.clock = clock
+        self._heap = []
+        self._jobs = {}
+        self._sent = set()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def _job_id(self, key, event_date):
+        return (str(key), event_date.isoformat())
+
+    def _schedule(self, event):
+        key = event_key(event)
+        event_date = parse_event_date(event.get('eventDate'))
+        if event_date is None or event_date < self.clock():
+            self._jobs.pop(key, None)
+            return
+        fire_time = event_date - self.lead
+        self._jobs[key] = (fire_time, event)
+        heapq.heappush(self._heap, (fire_time, str(key), key))
+
+    def build(self, events):
+        """Replace all jobs with reminders for ``events``."""
+        with self._condition:
+            self._heap = []
+            self._jobs = {}
+            for event in events:
+                self._schedule(event)
+            self._condition.notify()
+
+    def schedule(self, event):
+        """Schedule, or move, the reminder for a created or updated event."""
+        with self._condition:
+            self._schedule(event)
+            self._condition.notify()
+
+    def unschedule(self, key):
+        """Drop the reminder for an event."""
+        with self._condition:
+            self._jobs.pop(key, None)
+
+    def due(self):
+        """Return the next fire time, or None when nothing is scheduled."""
+        with self._condition:
+            return min((job[0] for job in self._jobs.values()), default=None)
+
+    def _pop_due(self, now):
+        """Pop the next due job, skipping stale and already sent entries."""
+        while self._heap and self._heap[0][0] <= now:
+            fire_time, _, key = heapq.heappop(self._heap)
+            job = self._jobs.get(key)
+            if job is None or job[0] != fire_time:
+                continue
+            del self._jobs[key]
+            event = job[1]
+            job_id = self._job_id(key, parse_event_date(event.get('eventDate')))
+            if job_id not in self._sent:
+                return job_id, event
+        return None
+
+    def run_pending(self):
+        """Send every reminder that is due, in one call to ``send``; returns how many were sent."""
+        due = []
+        with self._condition:
+            now = self.clock()
+            while True:
+                job = self._pop_due(now)
+                if job is None:
+                    break
+                due.append(job)
+        if not due:
+            return 0
+        events = [event for _, event in due]
+        try:
+            self.send(events)
+        except Exception:
+            # Put the jobs back so the next pass retries them
+            for event in events:
+                self.schedule(event)
+            raise
+        for job_id, _ in due:
+            with self._condition:
+                self._sent.add(job_id)
+            if self.log is None:
+                continue
+            try:
+                self.log.record(*job_id)
+            except Exception as e:
+                # The reminder went out; a failed record must not stop the others being recorded
+                print(f"Error recording reminder for {job_id[0]} on {job_id[1]}:", e)
+        return len(due)
+
+    def _next_delay(self):
+        if not self._heap:
+            return None
+        return max((self._heap[0][0] - self.clock()).total_seconds(), 0)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopping:
+                    delay = self._next_delay()
+                    if delay == 0:
+                        break
+                    self._condition.wait(delay)
+                if self._stopping:
+                    return
+            try:
+                self.run_pending()
+            except Exception as e:
+                print("Error sending reminders:", e)
+                with self._condition:
+                    self._condition.wait(1)
+
+    def load(self):
+        """Load the reminders already sent from the log."""
+        if self.log is not None:
+            sent = self.log.sent(since=self.clock().date().isoformat())
+            with self._condition:
+                self._sent |= sent
+
+    def start(self):
+        """Load sent reminders from the log and start the timer thread."""
+        if self._thread is not None:
+            return
+        self.load()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the timer thread."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -1,7 +1,7 @@
 import os
-import bcrypt
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from passwords import PasswordHasherBusy, hash_password, rehash_in_background, verify_password
 
 # Load environment variables
 load_dotenv()
@@ -15,16 +15,6 @@ if not SUPABASE_URL or not SUPABASE_KEY:
 # Initialize Supabase client
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
-
-def verify_password(password: str, hashed_password: str) -> bool:
-    """Verify a password against a hashed password."""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
-
 def cleanup_user(username: str):
     """Delete a user from the database by username."""
     try:
@@ -48,6 +38,10 @@ def create_user(username: str, password: str):
     except Exception as e:
         print("Error creating user:", e)
 
+def save_password(username: str, hashed_password: str):
+    """Replace a user's stored password hash."""
+    supabase.from_("usercredential").update({"password": hashed_password}).eq("username", username).execute()
+
 def authenticate_user(username: str, password: str) -> bool:
     """Authenticate a user by checking the password."""
     try:
@@ -55,6 +49,7 @@ def authenticate_user(username: str, password: str) -> bool:
         if result.data:
             stored_password = result.data[0]["password"]
             if verify_password(password, stored_password):
+                rehash_in_background(password, stored_password, lambda hashed: save_password(username, hashed))
                 print("Authentication successful.")
                 return True
             else:
@@ -62,6 +57,9 @@ def authenticate_user(username: str, password: str) -> bool:
         else:
             print("Authentication failed: User not found.")
         return False
+    except PasswordHasherBusy:
+        # Saturation is not a failed login; let the caller retry or report it
+        raise
     except Exception as e:
         print("Error during authentication:", e)
         return False
@@ -0,0 +1,19 @@
+"""Shared test doubles and fixtures"""
+import sqlite3
+from notifications import NotificationStore, SQLNotificationBackend
+
+class FakeClock:
+    """A clock that stays at ``now`` until a test moves it"""
+
+    def __init__(self, now=0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def sqlite_store(connection=None, **options):
+    """A notification store backed by an in-memory SQLite database"""
+    backend = SQLNotificationBackend(connection or sqlite3.connect(':memory:', check_same_thread=False))
+    backend.create_table()
+    options.setdefault('flush_interval', None)
+    return NotificationStore(backend, **options)
@@ -0,0 +1,48 @@
+import unittest
+from datetime import datetime
+from benchmarks.synthetic import generate_dataset
+from benchmarks.run import run_scale
+import app
+from app import db, rebuild_volunteer_index, rebuild_event_index
+
+TINY = {'users': 50, 'events': 10, 'history': 20, 'notifications': 30}
+
+class SyntheticDataTestCase(unittest.TestCase):
+    def test_same_seed_same_data(self):
+        """Test that datasets are reproducible from their seed"""
+        now = datetime(2025, 1, 1)
+        self.assertEqual(generate_dataset(TINY, seed=5, now=now), generate_dataset(TINY, seed=5, now=now))
+        self.assertNotEqual(generate_dataset(TINY, seed=5, now=now), generate_dataset(TINY, seed=6, now=now))
+
+    def test_dataset_sizes(self):
+        """Test the row counts of a generated dataset"""
+        data = generate_dataset(TINY)
+        self.assertEqual(len(data['users']), 50)
+        self.assertEqual(len(data['events']), 10)
+        self.assertEqual(len(data['history']), 20)
+        self.assertEqual(len(data['notifications']), 30)
+
+class BenchmarkSuiteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.notification_store = app.notification_store
+
+    def tearDown(self):
+        app.notification_store = self.notification_store
+        db['users'] = []
+        db['events'] = []
+        rebuild_volunteer_index()
+        rebuild_event_index()
+
+    def test_results_are_machine_readable(self):
+        """Test that every benchmark reports its timings"""
+        results = run_scale('small', seed=0, repeat=1)
+        self.assertEqual({r['benchmark'] for r in results}, {
+            'calculate_match_score', 'rebuild_volunteer_index', 'find_best_matches', 'validate_data',
+            'generate_csv', 'generate_pdf', 'check_upcoming_events', 'notification_create_batch',
+            'notification_page', 'notification_mark_read'
+        })
+        for result in results:
+            self.assertLessEqual(result['min'], result['median'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+import unittest
+import json
+import random
+import uuid
+from unittest.mock import patch, MagicMock
+import bulk_matching
+from bulk_matching import BulkMatcher, ParallelMatcher, bulk_match, merge_top_k
+from app import (app, db, calculate_match_score, find_best_matches, match_all_events, rebuild_volunteer_index,
+                 reset_bulk_matcher)
+
+SKILLS = ['First Aid', 'CPR', 'Driving', 'Heavy Lifting', 'Teaching', 'Cooking', 'Translation', 'Registration']
+
+def reference_matches(volunteers, event, threshold=50, max_matches=5):
+    """Pairwise matches computed with calculate_match_score"""
+    scores = []
+    for volunteer in volunteers:
+        score = calculate_match_score(volunteer.get('skills', []), event['requiredSkills'])
+        if score > threshold:
+            scores.append({'username': volunteer['username'], 'score': score, 'email': volunteer['email']})
+    return sorted(scores, key=lambda x: (-x['score'], x['username']))[:max_matches]
+
+class BulkMatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up a seeded random volunteer pool and event catalog"""
+        rng = random.Random(42)
+        self.volunteers = [
+            {
+                'username': f'volunteer_{i}',
+                'email': f'volunteer_{i}@example.com',
+                'skills': [rng.choice([s, s.upper(), s.lower()]) for s in rng.sample(SKILLS, rng.randint(0, 4))]
+            }
+            for i in range(300)
+        ]
+        self.events = [
+            {'eventName': f'Event {i}', 'requiredSkills': rng.sample(SKILLS, rng.randint(1, 4)) + ['Unlisted Skill'] * (i % 2)}
+            for i in range(40)
+        ]
+
+    def test_matches_are_identical_to_pairwise_scoring(self):
+        """Test that bulk top-k results equal find_best_matches semantics"""
+        results = bulk_match(self.volunteers, self.events)
+        for entry, event in zip(results, self.events):
+            self.assertEqual(entry['matches'], reference_matches(self.volunteers, event))
+
+    def test_threshold_and_limit(self):
+        """Test custom thresholds and result limits"""
+        matcher = BulkMatcher(self.volunteers)
+        results = matcher.match_events(self.events, threshold=25, max_matches=20)
+        for matches, event in zip(results, self.events):
+            self.assertEqual(matches, reference_matches(self.volunteers, event, threshold=25, max_matches=20))
+
+    def test_fallback_without_numpy(self):
+        """Test that the skill index answers the same queries without numpy"""
+        with patch.object(bulk_matching, 'np', None):
+            matcher = BulkMatcher(self.volunteers)
+            self.assertFalse(matcher.vectorized)
+            results = matcher.match_events(self.events)
+        for matches, event in zip(results, self.events):
+            self.assertEqual(matches, reference_matches(self.volunteers, event))
+
+class ParallelMatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(3)
+        self.volunteers = [
+            {'username': f'volunteer_{i}', 'email': None, 'skills': rng.sample(SKILLS, rng.randint(0, 4))}
+            for i in range(500)
+        ]
+        self.events = [{'eventName': f'Event {i}', 'requiredSkills': rng.sample(SKILLS, rng.randint(1, 4))} for i in range(20)]
+
+    def test_parallel_matches_equal_single_process(self):
+        """Test that merged per-chunk results equal single-process matching"""
+        expected = BulkMatcher(self.volunteers).match_events(self.events, max_matches=7)
+        with ParallelMatcher(self.volunteers, workers=3, min_pool_size=0) as matcher:
+            self.assertTrue(matcher.parallel)
+            self.assertEqual(len(matcher.chunks), 3)
+            self.assertEqual(matcher.match_events(self.events, max_matches=7), expected)
+            self.assertEqual(matcher.match_events(self.events[:2], max_matches=7), expected[:2])
+
+    def test_close_waits_for_retained_callers(self):
+        """Test that closing defers to running callers and then refuses new work"""
+        expected = BulkMatcher(self.volunteers).match_events(self.events)
+        matcher = ParallelMatcher(self.volunteers, workers=2, min_pool_size=0)
+        matcher.retain()
+        matcher.close()
+        self.assertEqual(matcher.match_events(self.events), expected)
+        self.assertEqual(len(matcher._executors), 2)
+        matcher.release()
+        self.assertIsNone(matcher._executors)
+        with self.assertRaises(RuntimeError):
+            matcher.match_events(self.events)
+        with self.assertRaises(RuntimeError):
+            matcher.retain()
+
+    def test_workers_are_not_forked(self):
+        """Test that workers start from a fresh interpreter rather than a fork of the server"""
+        with ParallelMatcher(self.volunteers, workers=2, min_pool_size=0) as matcher:
+            matcher.match_events(self.events)
+            self.assertIn(matcher._executors[0]._mp_context.get_start_method(), ('forkserver', 'spawn'))
+
+    def test_slow_workers_fall_back_to_in_process(self):
+        """Test that workers missing the timeout are retired and the batch matched in-process"""
+        expected = BulkMatcher(self.volunteers).match_events(self.events)
+        with ParallelMatcher(self.volunteers, workers=2, min_pool_size=0, timeout=0) as matcher:
+            self.assertEqual(matcher.match_events(self.events), expected)
+            self.assertIsNone(matcher._executors)
+
+    def test_small_pools_stay_in_process(self):
+        """Test the single-process fallback for small pools"""
+        with ParallelMatcher(self.volunteers, workers=4) as matcher:
+            self.assertFalse(matcher.parallel)
+            self.assertEqual(matcher.match_events(self.events), BulkMatcher(self.volunteers).match_events(self.events))
+
+    def test_merge_top_k(self):
+        """Test merging ranked chunk results"""
+        chunks = [
+            [{'username': 'b', 'score': 100.0}, {'username': 'd', 'score': 60.0}],
+            [{'username': 'a', 'score': 100.0}, {'username': 'c', 'score': 75.0}]
+        ]
+        self.assertEqual([m['username'] for m in merge_top_k(chunks, 3)], ['a', 'b', 'c'])
+
+class BatchEventMatchesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+        rng = random.Random(7)
+        db['users'] = [
+            {'username': f'volunteer_{i}', 'email': f'volunteer_{i}@example.com', 'skills': rng.sample(SKILLS, 2)}
+            for i in range(50)
+        ]
+        rebuild_volunteer_index()
+        self.events = [
+            {'id': 'e1', 'eventName': 'Medical Training', 'requiredSkills': ['First Aid', 'CPR']},
+            {'id': 'e2', 'eventName': 'Food Drive', 'requiredSkills': ['Driving', 'Cooking', 'Heavy Lifting']}
+        ]
+
+    def tearDown(self):
+        db['users'] = []
+        rebuild_volunteer_index()
+
+    @patch('app.supabase')
+    def test_batch_matches_equal_single_event_matches(self, mock_supabase):
+        """Test that one batch request returns the same matches as per-event calls"""
+        query = mock_supabase.table.return_value.select.return_value
+        query.in_.return_value.execute.return_value = MagicMock(data=self.events)
+
+        response = self.app.post(
+            '/matches/events',
+            data=json.dumps({'event_names': ['Medical Training', 'Food Drive', 'Unknown'], 'limit': 3}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        query.in_.assert_called_once_with('eventName', ['Medical Training', 'Food Drive', 'Unknown'])
+        self.assertEqual(data['missing'], ['Unknown'])
+        for entry, event in zip(data['matches'], self.events):
+            self.assertEqual(entry['event']['eventName'], event['eventName'])
+            self.assertEqual(entry['matches'], find_best_matches(event, max_matches=3))
+
+    def test_pool_change_during_bulk_match(self):
+        """Test that a pool reset while matching does not break the running match"""
+        def events_after_reset():
+            reset_bulk_matcher()
+            return self.events
+        with patch('app.event_index.events', side_effect=events_after_reset):
+            results = match_all_events()
+        self.assertEqual([entry['matches'] for entry in results],
+                         [find_best_matches(event) for event in self.events])
+
+    def test_batch_requires_events(self):
+        """Test validation of the batch request body"""
+        response = self.app.post('/matches/events', data=json.dumps({}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', json.loads(response.data))
+        for body in ({'event_names': [{'a': 1}]}, {'event_ids': [['e1']]}):
+            response = self.app.post('/matches/events', data=json.dumps(body), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+
+    @patch('app.supabase')
+    def test_batch_rejects_event_ids_that_are_not_uuids(self, mock_supabase):
+        """Test that malformed event IDs are a 400 rather than a failed uuid cast"""
+        response = self.app.post('/matches/events', data=json.dumps({'event_ids': ['e1']}),
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.data)['error'], ['event_ids must be UUIDs.'])
+        mock_supabase.table.assert_not_called()
+
+        event_id = str(uuid.uuid4())
+        query = mock_supabase.table.return_value.select.return_value
+        query.in_.return_value.execute.return_value = MagicMock(data=[{**self.events[0], 'id': event_id}])
+        response = self.app.post('/matches/events', data=json.dumps({'event_ids': [event_id.upper()]}),
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        query.in_.assert_called_once_with('id', [event_id])
+        self.assertEqual(json.loads(response.data)['missing'], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+import sqlite3
+import threading
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock
+from reminders import EventCalendar, ReminderScheduler, SQLReminderLog, SupabaseReminderLog
+from app import db, fetch_events_between, check_upcoming_events, send_event_reminders, rebuild_volunteer_index, rebuild_event_index
+from tests.helpers import FakeClock, sqlite_store
+
+class EventCalendarTestCase(unittest.TestCase):
+    def setUp(self):
+        self.calendar = EventCalendar()
+        self.calendar.build([
+            {'id': 3, 'eventName': 'Third', 'eventDate': '2025-03-03'},
+            {'id': 1, 'eventName': 'First', 'eventDate': '2025-03-01'},
+            {'id': 2, 'eventName': 'Second', 'eventDate': '2025-03-02T18:00:00'},
+            {'id': 4, 'eventName': 'Undated', 'eventDate': 'soon'}
+        ])
+
+    def names(self, start, end):
+        return [event['eventName'] for event in self.calendar.between(start, end)]
+
+    def test_range_lookup(self):
+        """Test that lookups return the events within the window, earliest first"""
+        self.assertEqual(len(self.calendar), 3)
+        self.assertEqual(self.names(datetime(2025, 3, 1), datetime(2025, 3, 2, 23)), ['First', 'Second'])
+        self.assertEqual(self.names(datetime(2025, 3, 1, 1), datetime(2025, 3, 3)), ['Second', 'Third'])
+        self.assertEqual(self.names(datetime(2025, 4, 1), datetime(2025, 4, 2)), [])
+
+    def test_add_moves_and_remove(self):
+        """Test rescheduling and removing events"""
+        self.calendar.add({'id': 1, 'eventName': 'First', 'eventDate': '2025-03-04'})
+        self.calendar.add({'id': 5, 'eventName': 'Fifth', 'eventDate': '2025-03-02'})
+        self.assertEqual(self.names(datetime(2025, 3, 1), datetime(2025, 3, 5)), ['Fifth', 'Second', 'Third', 'First'])
+
+        self.calendar.remove(5)
+        self.calendar.add({'id': 2, 'eventName': 'Second', 'eventDate': None})
+        self.assertNotIn(2, self.calendar)
+        self.assertEqual(self.names(datetime(2025, 3, 1), datetime(2025, 3, 5)), ['Third', 'First'])
+
+class ReminderSchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(datetime(2025, 3, 1, 9))
+        self.connection = sqlite3.connect(':memory:', check_same_thread=False)
+        self.log = SQLReminderLog(self.connection)
+        self.log.create_table()
+        self.sent = []
+        self.events = [
+            {'id': 'a', 'eventName': 'Alpha', 'eventDate': '2025-03-02'},
+            {'id': 'b', 'eventName': 'Beta', 'eventDate': '2025-03-04'},
+            {'id': 'c', 'eventName': 'Past', 'eventDate': '2025-02-20'}
+        ]
+
+    def scheduler(self):
+        scheduler = ReminderScheduler(
+            lambda events: self.sent.extend(event['id'] for event in events), log=self.log, clock=self.clock
+        )
+        scheduler.load()
+        scheduler.build(self.events)
+        return scheduler
+
+    def test_fires_each_reminder_once(self):
+        """Test that reminders fire a day ahead and only once"""
+        scheduler = self.scheduler()
+        self.assertEqual(len(scheduler), 2)
+        self.assertEqual(scheduler.due(), datetime(2025, 3, 1))
+
+        self.assertEqual(scheduler.run_pending(), 1)
+        self.assertEqual(scheduler.run_pending(), 0)
+        self.clock.now = datetime(2025, 3, 3, 1)
+        scheduler.run_pending()
+        self.assertEqual(self.sent, ['a', 'b'])
+        self.assertIsNone(scheduler.due())
+
+    def test_restart_neither_drops_nor_duplicates(self):
+        """Test that a new scheduler resumes from the persisted log"""
+        self.scheduler().run_pending()
+        self.clock.now = datetime(2025, 3, 3, 12)
+        self.scheduler().run_pending()
+        self.assertEqual(self.sent, ['a', 'b'])
+
+    def test_rescheduled_event_fires_for_new_date(self):
+        """Test that moving an event replaces its pending reminder"""
+        scheduler = self.scheduler()
+        scheduler.schedule({'id': 'a', 'eventName': 'Alpha', 'eventDate': '2025-03-10'})
+        self.assertEqual(scheduler.run_pending(), 0)
+        self.clock.now = datetime(2025, 3, 9, 0)
+        scheduler.run_pending()
+        self.assertEqual(self.sent, ['b', 'a'])
+
+    def test_failed_send_is_retried(self):
+        """Test that a reminder whose send fails stays scheduled"""
+        attempts = []
+        def send(events):
+            attempts.extend(event['id'] for event in events)
+            if len(attempts) == 1:
+                raise RuntimeError('store unavailable')
+        scheduler = ReminderScheduler(send, log=self.log, clock=self.clock)
+        scheduler.build(self.events[:1])
+        with self.assertRaises(RuntimeError):
+            scheduler.run_pending()
+        self.assertEqual(self.log.sent(), set())
+        self.assertEqual(scheduler.run_pending(), 1)
+        self.assertEqual(self.log.sent(), {('a', '2025-03-02T00:00:00')})
+
+    def test_failed_record_does_not_stop_the_others(self):
+        """Test that a reminder whose log write fails does not leave the rest unrecorded"""
+        record = self.log.record
+        def flaky_record(event_id, event_date):
+            if event_id == 'a':
+                raise RuntimeError('log unavailable')
+            record(event_id, event_date)
+        self.events[1]['eventDate'] = '2025-03-02T06:00:00'
+        scheduler = self.scheduler()
+        with patch.object(self.log, 'record', side_effect=flaky_record):
+            self.assertEqual(scheduler.run_pending(), 2)
+        self.assertEqual(self.log.sent(), {('b', '2025-03-02T06:00:00')})
+        scheduler.build(self.events)
+        self.assertEqual(scheduler.run_pending(), 0)
+        self.assertEqual(self.sent, ['a', 'b'])
+
+    def test_load_reads_only_upcoming_entries(self):
+        """Test that the sent log is read from today on"""
+        self.log.record('old', '2025-02-01T00:00:00')
+        self.log.record('a', '2025-03-02T00:00:00')
+        self.assertEqual(self.log.sent(since='2025-03-01'), {('a', '2025-03-02T00:00:00')})
+        with patch.object(self.log, 'sent', wraps=self.log.sent) as sent:
+            self.scheduler()
+        sent.assert_called_once_with(since='2025-03-01')
+
+        client = MagicMock()
+        SupabaseReminderLog(client).sent(since='2025-03-01')
+        client.table.return_value.select.return_value.gte.assert_called_once_with('eventdate', '2025-03-01')
+
+    def test_timer_thread_wakes_for_new_jobs(self):
+        """Test that the background thread fires a job scheduled while it sleeps"""
+        fired = threading.Event()
+        scheduler = ReminderScheduler(lambda events: fired.set(), clock=self.clock)
+        scheduler.start()
+        try:
+            scheduler.schedule({'id': 'x', 'eventName': 'Soon', 'eventDate': '2025-03-01T12:00:00'})
+            self.assertTrue(fired.wait(5))
+        finally:
+            scheduler.stop()
+
+class UpcomingEventsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.store = sqlite_store()
+        self.store_patch = patch('app.notification_store', self.store)
+        self.store_patch.start()
+        db['users'] = [{'username': 'medic', 'email': 'medic@example.com', 'skills': ['First Aid']}]
+        rebuild_volunteer_index()
+        tomorrow = (datetime.now() + timedelta(days=1)).date().isoformat()
+        db['events'] = [
+            {'id': 'soon', 'eventName': 'Soon', 'requiredSkills': ['First Aid'], 'eventDate': tomorrow},
+            {'id': 'later', 'eventName': 'Later', 'requiredSkills': ['First Aid'],
+             'eventDate': (datetime.now() + timedelta(days=30)).date().isoformat()}
+        ]
+        rebuild_event_index()
+
+    def tearDown(self):
+        self.store_patch.stop()
+        db['users'] = []
+        db['events'] = []
+        rebuild_volunteer_index()
+        rebuild_event_index()
+
+    def test_sweep_only_reminds_upcoming_events(self):
+        """Test that events outside the next day are not reminded"""
+        check_upcoming_events(test_mode=True)
+        self.assertEqual([n['related_id'] for n in self.store.get('medic')], ['Soon'])
+
+    def test_repeated_sweeps_do_not_duplicate_reminders(self):
+        """Test that reminders repeated within the dedupe window are dropped"""
+        self.store.dedupe_window = 3600
+        check_upcoming_events(test_mode=True)
+        check_upcoming_events(test_mode=True)
+        self.assertEqual(len(self.store.get('medic')), 1)
+        self.assertEqual(self.store.stats()['deduplicated'], 1)
+
+    def test_reminders_due_together_are_coalesced(self):
+        """Test that a volunteer gets one reminder for several events tomorrow"""
+        tomorrow = db['events'][0]['eventDate']
+        events = [
+            {'id': f'e{i}', 'eventName': f'Shift {i}', 'requiredSkills': ['First Aid'], 'eventDate': tomorrow}
+            for i in range(3)
+        ]
+        send_event_reminders(events)
+        notifications = self.store.get('medic')
+        self.assertEqual(len(notifications), 1)
+        self.assertEqual(notifications[0]['message'], 'Reminder: 3 events tomorrow: Shift 0, Shift 1, Shift 2')
+        self.assertEqual(self.store.stats()['coalesced'], 2)
+
+    @patch('app.supabase')
+    def test_database_backend_queries_the_window(self, mock_supabase):
+        """Test that the database backend pushes the date range into the query"""
+        start = datetime(2025, 3, 1, 12)
+        query = mock_supabase.table.return_value.select.return_value.gte.return_value.lte.return_value
+        query.execute.return_value = MagicMock(data=[
+            {'eventName': 'Morning', 'eventDate': '2025-03-01'},
+            {'eventName': 'Tomorrow', 'eventDate': '2025-03-02'}
+        ])
+
+        events = fetch_events_between(start, start + timedelta(days=1))
+
+        mock_supabase.table.return_value.select.return_value.gte.assert_called_once_with('eventDate', '2025-03-01')
+        query_lte = mock_supabase.table.return_value.select.return_value.gte.return_value.lte
+        query_lte.assert_called_once_with('eventDate', '2025-03-02')
+        self.assertEqual([event['eventName'] for event in events], ['Tomorrow'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,434 @@
+import sys
+import threading
+import unittest
+import json
+from datetime import date, timedelta
+from unittest.mock import patch, MagicMock
+from matching import (VolunteerSkillIndex, EventSkillIndex, MatchCache, SkillVocabulary, canonical_skills,
+                      minimum_overlap, skill_vocabulary)
+from app import (app, db, calculate_match_score, event_index, fetch_all, find_best_matches, load_event_catalog,
+                 load_volunteer_pool, match_cache, upsert_volunteer, rebuild_volunteer_index, rebuild_event_index,
+                 user_cache)
+
+class VolunteerSkillIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up a small volunteer pool"""
+        self.users = [
+            {'username': 'first_aid_expert', 'email': 'first.aid@example.com',
+             'skills': ['First Aid', 'CPR', 'Emergency Response']},
+            {'username': 'tech_volunteer', 'email': 'tech@example.com',
+             'skills': ['Computer Repair', 'Teaching', 'Documentation']},
+            {'username': 'general_helper', 'email': 'helper@example.com',
+             'skills': ['Heavy Lifting', 'First Aid', 'Driving']},
+            {'username': 'no_skills', 'email': 'none@example.com'}
+        ]
+        self.index = VolunteerSkillIndex()
+        self.index.build(self.users)
+
+    def test_match_only_scores_overlapping_volunteers(self):
+        """Test that only volunteers sharing a skill are candidates"""
+        candidates = self.index.candidates(skill_vocabulary.ids({'first aid', 'cpr'}))
+        self.assertEqual(set(candidates), {'first_aid_expert', 'general_helper'})
+        self.assertEqual(candidates['first_aid_expert'], 2)
+        self.assertEqual(candidates['general_helper'], 1)
+
+    def test_match_scores_agree_with_calculate_match_score(self):
+        """Test that indexed scores are identical to the pairwise scorer"""
+        required = ['first aid', 'CPR', 'Driving']
+        expected = [
+            (user['username'], calculate_match_score(user.get('skills', []), required))
+            for user in self.users
+            if calculate_match_score(user.get('skills', []), required) > 50
+        ]
+        matches = self.index.match(required)
+        self.assertEqual([(m['username'], m['score']) for m in matches], expected)
+
+    def test_candidates_prune_volunteers_below_threshold(self):
+        """Test that volunteers who cannot pass the threshold are never counted"""
+        required = {'first aid', 'cpr', 'emergency response', 'driving'}
+        self.assertEqual(minimum_overlap(len(required), 50), 3)
+        self.index.add({'username': 'solo', 'email': 'solo@example.com', 'skills': ['First Aid', 'CPR']})
+        candidates = self.index.candidates(skill_vocabulary.ids(required), min_overlap=3)
+        self.assertNotIn('solo', candidates)
+        self.assertEqual(candidates['first_aid_expert'], 3)
+        self.assertEqual([m['username'] for m in self.index.match(required)], ['first_aid_expert'])
+
+    def test_ties_are_ordered_by_username(self):
+        """Test deterministic ordering and limits for tied scores"""
+        index = VolunteerSkillIndex()
+        index.build([
+            {'username': name, 'email': f'{name}@example.com', 'skills': ['Driving']}
+            for name in ['zoe', 'adam', 'mia', 'bob']
+        ])
+        matches = index.match(['driving'], max_matches=3)
+        self.assertEqual([m['username'] for m in matches], ['adam', 'bob', 'mia'])
+        self.assertEqual(index.match(['driving', 'cpr'], threshold=49), index.match(['driving', 'cpr'], threshold=49, max_matches=4))
+        self.assertEqual(index.match(['driving', 'cpr']), [])
+
+    def test_update_and_remove_volunteer(self):
+        """Test that profile edits move a volunteer between postings lists"""
+        self.index.add({'username': 'tech_volunteer', 'email': 'tech@example.com',
+                        'skills': ['CPR', 'First Aid']})
+        self.assertIn('tech_volunteer', self.index.candidates(skill_vocabulary.ids({'cpr'})))
+        self.assertNotIn('tech_volunteer', self.index.candidates(skill_vocabulary.ids({'teaching'})))
+
+        self.index.remove('tech_volunteer')
+        self.assertNotIn('tech_volunteer', self.index)
+        self.assertEqual(len(self.index), 3)
+
+    def test_match_while_profiles_change(self):
+        """Test that matching is safe while another thread edits the index"""
+        for i in range(500):
+            self.index.add({'username': f'volunteer{i}', 'email': None, 'skills': ['First Aid', 'CPR']})
+        stop = threading.Event()
+        errors = []
+        def edit():
+            for i in range(5000):
+                self.index.add({'username': f'volunteer{i % 500}', 'email': None, 'skills': ['First Aid', f'skill{i}']})
+                self.index.remove(f'volunteer{(i + 250) % 500}')
+            stop.set()
+        def match():
+            try:
+                while not stop.is_set():
+                    self.index.match(['first aid', 'cpr'], threshold=40)
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=match) for _ in range(4)] + [threading.Thread(target=edit)]
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(errors, [])
+
+class VolunteerPoolLoadTestCase(unittest.TestCase):
+    def tearDown(self):
+        db['users'] = []
+        rebuild_volunteer_index()
+
+    def test_fetch_all_pages_until_a_short_page(self):
+        """Test that rows past the first page are fetched"""
+        rows = [{'id': i} for i in range(5)]
+        query = MagicMock()
+        query.return_value.range.side_effect = lambda start, end: MagicMock(
+            execute=MagicMock(return_value=MagicMock(data=rows[start:end + 1]))
+        )
+        self.assertEqual(fetch_all(query, page_size=2), rows)
+        self.assertEqual([call.args for call in query.return_value.range.call_args_list], [(0, 1), (2, 3), (4, 5)])
+
+    @patch('app.supabase')
+    def test_pool_larger_than_one_page_is_indexed(self, mock_supabase):
+        """Test that load_volunteer_pool indexes volunteers beyond the first 1000 rows"""
+        users = [{'username': f'user{i:04d}', 'email': None, 'skills': ['Driving']} for i in range(1500)]
+        select = mock_supabase.table.return_value.select.return_value.order.return_value
+        select.range.side_effect = lambda start, end: MagicMock(
+            execute=MagicMock(return_value=MagicMock(data=users[start:end + 1]))
+        )
+        load_volunteer_pool()
+        self.assertEqual(len(db['users']), 1500)
+        matches = find_best_matches({'eventName': 'Drive', 'requiredSkills': ['driving']}, max_matches=2000)
+        self.assertEqual(len(matches), 1500)
+
+class DatabaseMatchBackendTestCase(unittest.TestCase):
+    @patch('app.MATCH_BACKEND', 'database')
+    @patch('app.supabase')
+    def test_find_best_matches_calls_rpc(self, mock_supabase):
+        """Test that the database backend scores volunteers through match_volunteers"""
+        mock_supabase.rpc.return_value.execute.return_value = MagicMock(
+            data=[{'username': 'medic', 'email': 'medic@example.com', 'score': 100.0}]
+        )
+        matches = find_best_matches({'eventName': 'Medical Training', 'requiredSkills': ['First Aid']},
+                                    max_matches=3, threshold=60)
+        mock_supabase.rpc.assert_called_once_with('match_volunteers', {
+            'required_skills': ['First Aid'], 'match_threshold': 60, 'max_matches': 3
+        })
+        self.assertEqual(matches, [{'username': 'medic', 'score': 100.0, 'email': 'medic@example.com'}])
+
+class SkillVocabularyTestCase(unittest.TestCase):
+    def test_canonical_skills(self):
+        """Test write-time normalization of case, whitespace and duplicates"""
+        self.assertEqual(
+            canonical_skills(['  First   Aid ', 'first aid', 'CPR', ' ', 'cpr']),
+            ['first aid', 'cpr']
+        )
+
+    def test_interning_is_stable(self):
+        """Test that every spelling of a skill maps to the same ID"""
+        vocabulary = SkillVocabulary()
+        first_aid = vocabulary.intern('First Aid')
+        self.assertEqual(vocabulary.intern(' first  AID'), first_aid)
+        self.assertEqual(vocabulary.intern('CPR'), first_aid + 1)
+        self.assertEqual(vocabulary.ids(['first aid', 'cpr', 'CPR']), frozenset({first_aid, first_aid + 1}))
+        self.assertEqual(vocabulary.name(first_aid), 'first aid')
+        self.assertEqual(len(vocabulary), 2)
+
+    def test_match_score_ignores_whitespace(self):
+        """Test that calculate_match_score compares canonical skills"""
+        self.assertEqual(calculate_match_score(['First  Aid'], [' first aid', 'CPR']), 50.0)
+
+class FindBestMatchesTestCase(unittest.TestCase):
+    def setUp(self):
+        db['users'] = [
+            {'username': 'medic', 'email': 'medic@example.com', 'skills': ['First Aid', 'CPR']},
+            {'username': 'driver', 'email': 'driver@example.com', 'skills': ['Driving']}
+        ]
+        rebuild_volunteer_index()
+
+    def tearDown(self):
+        db['users'] = []
+        rebuild_volunteer_index()
+
+    def test_find_best_matches_uses_index(self):
+        """Test event matching through the volunteer skill index"""
+        matches = find_best_matches({'eventName': 'Medical Training', 'requiredSkills': ['first aid', 'cpr']})
+        self.assertEqual(matches, [{'username': 'medic', 'score': 100.0, 'email': 'medic@example.com'}])
+
+class EventMatchesRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+        db['users'] = [
+            {'username': name, 'email': f'{name}@example.com', 'skills': skills}
+            for name, skills in [('cara', ['First Aid']), ('ben', ['First Aid', 'CPR']), ('al', ['First Aid'])]
+        ]
+        rebuild_volunteer_index()
+
+    def tearDown(self):
+        db['users'] = []
+        rebuild_volunteer_index()
+
+    @patch('app.supabase')
+    def test_threshold_and_limit_query_parameters(self, mock_supabase):
+        """Test /matches/event with threshold and limit parameters"""
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = MagicMock(
+            data=[{'eventName': 'Medical Training', 'requiredSkills': ['First Aid', 'CPR']}]
+        )
+        response = self.app.get('/matches/event/Medical Training')
+        matches = json.loads(response.data)['matches']
+        self.assertEqual([m['username'] for m in matches], ['ben'])
+
+        response = self.app.get('/matches/event/Medical Training?threshold=40&limit=2')
+        matches = json.loads(response.data)['matches']
+        self.assertEqual([(m['username'], m['score']) for m in matches], [('ben', 100.0), ('al', 50.0)])
+
+        response = self.app.get('/matches/event/Medical Training?limit=zero')
+        self.assertEqual(response.status_code, 400)
+
+class MatchCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache = MatchCache()
+        self.medical = {'eventName': 'Medical Training', 'requiredSkills': ['First Aid', 'CPR']}
+        self.driving = {'eventName': 'Food Drive', 'requiredSkills': ['Driving']}
+        self.cache.put_event(self.medical, [{'username': 'medic', 'score': 100.0, 'email': None}])
+        self.cache.put_event(self.driving, [{'username': 'driver', 'score': 100.0, 'email': None}])
+
+    def test_hits_and_misses(self):
+        """Test hit and miss counters"""
+        self.assertIsNotNone(self.cache.get_event(self.medical))
+        self.assertIsNone(self.cache.get_event(self.medical, threshold=25))
+        self.assertIsNone(self.cache.get_event({'eventName': 'Medical Training', 'requiredSkills': ['CPR']}))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_volunteer_update_invalidates_only_affected_events(self):
+        """Test that a profile edit drops only the events it can change"""
+        self.cache.invalidate_volunteer({'username': 'newcomer', 'skills': ['cpr']})
+        self.assertIsNone(self.cache.get_event(self.medical))
+        self.assertIsNotNone(self.cache.get_event(self.driving))
+
+        self.cache.invalidate_volunteer({'username': 'driver', 'skills': ['Cooking']})
+        self.assertIsNone(self.cache.get_event(self.driving))
+
+    def test_event_update_invalidates_only_affected_volunteers(self):
+        """Test that a new event drops only the volunteers it can change"""
+        medic = {'username': 'medic', 'skills': ['First Aid']}
+        cook = {'username': 'cook', 'skills': ['Cooking']}
+        self.cache.put_volunteer(medic, [])
+        self.cache.put_volunteer(cook, [])
+        self.cache.invalidate_event({'eventName': 'First Aid Refresher', 'requiredSkills': ['first aid']})
+        self.assertIsNone(self.cache.get_volunteer(medic))
+        self.assertEqual(self.cache.get_volunteer(cook), [])
+
+    def test_put_after_invalidation_is_dropped(self):
+        """Test that a result computed across an invalidation is not cached"""
+        generation = self.cache.generation()
+        self.cache.invalidate_volunteer({'username': 'newcomer', 'skills': ['Cooking']})
+        self.cache.put_event(self.medical, [], generation=generation)
+        self.cache.put_volunteer({'username': 'medic', 'skills': ['CPR']}, [], generation=generation)
+        self.assertEqual(self.cache.get_event(self.medical), [{'username': 'medic', 'score': 100.0, 'email': None}])
+        self.assertIsNone(self.cache.get_volunteer({'username': 'medic', 'skills': ['CPR']}))
+
+        generation = self.cache.generation()
+        self.cache.put_event(self.medical, [], generation=generation)
+        self.assertEqual(self.cache.get_event(self.medical), [])
+
+class MatchCacheRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+        db['users'] = [{'username': 'medic', 'email': 'medic@example.com', 'skills': ['First Aid']}]
+        rebuild_volunteer_index()
+
+    def tearDown(self):
+        db['users'] = []
+        rebuild_volunteer_index()
+
+    @patch('app.supabase')
+    def test_registration_refreshes_cached_event_matches(self, mock_supabase):
+        """Test that cached event matches pick up newly registered volunteers"""
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = MagicMock(
+            data=[{'eventName': 'First Aid Training', 'requiredSkills': ['First Aid']}]
+        )
+        before = match_cache.stats()
+        first = json.loads(self.app.get('/matches/event/First Aid Training').data)['matches']
+        second = json.loads(self.app.get('/matches/event/First Aid Training').data)['matches']
+        self.assertEqual(first, second)
+        self.assertEqual(match_cache.stats()['hits'], before['hits'] + 1)
+
+        upsert_volunteer({'username': 'aid_worker', 'email': 'aid@example.com', 'skills': ['first aid']})
+        third = json.loads(self.app.get('/matches/event/First Aid Training').data)['matches']
+        self.assertEqual([m['username'] for m in third], ['aid_worker', 'medic'])
+
+        stats = json.loads(self.app.get('/admin/matches/cache').data)['cache']
+        self.assertEqual((stats['hits'], stats['misses']), (before['hits'] + 1, before['misses'] + 2))
+
+    @patch('app.supabase')
+    def test_registration_during_match_is_not_overwritten(self, mock_supabase):
+        """Test that matches computed while a volunteer registers are not cached"""
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = MagicMock(
+            data=[{'eventName': 'First Aid Training', 'requiredSkills': ['First Aid']}]
+        )
+        def register_midway(event, **kwargs):
+            matches = find_best_matches(event, **kwargs)
+            upsert_volunteer({'username': 'aid_worker', 'email': 'aid@example.com', 'skills': ['first aid']})
+            return matches
+        with patch('app.find_best_matches', side_effect=register_midway):
+            first = json.loads(self.app.get('/matches/event/First Aid Training').data)['matches']
+        self.assertEqual([m['username'] for m in first], ['medic'])
+        second = json.loads(self.app.get('/matches/event/First Aid Training').data)['matches']
+        self.assertEqual([m['username'] for m in second], ['aid_worker', 'medic'])
+
+class EventSkillIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up a catalog with past and upcoming events"""
+        self.today = date(2025, 6, 1)
+        self.events = [
+            {'eventName': 'Past Cleanup', 'requiredSkills': ['Heavy Lifting'], 'eventDate': '2025-05-01'},
+            {'eventName': 'Medical Training', 'requiredSkills': ['First Aid', 'CPR'], 'eventDate': '2025-06-10'},
+            {'eventName': 'Food Drive', 'requiredSkills': ['Driving', 'Heavy Lifting'],
+             'eventDate': '2025-06-01T10:00:00.000Z'},
+            {'eventName': 'Undated', 'requiredSkills': ['Driving'], 'eventDate': 'soon'}
+        ]
+        self.index = EventSkillIndex()
+        self.index.build(self.events, today=self.today)
+
+    def test_only_upcoming_events_are_indexed(self):
+        """Test that past and undated events are left out of the index"""
+        self.assertEqual(len(self.index), 2)
+        self.assertNotIn('Past Cleanup', self.index)
+        self.assertNotIn('Undated', self.index)
+
+    def test_match_scores_agree_with_calculate_match_score(self):
+        """Test that indexed event scores are identical to the pairwise scorer"""
+        skills = ['heavy lifting', 'Driving', 'CPR']
+        matches = self.index.match(skills, today=self.today)
+        self.assertEqual([m['event']['eventName'] for m in matches], ['Food Drive'])
+        self.assertEqual(matches[0]['matchScore'], calculate_match_score(skills, ['Driving', 'Heavy Lifting']))
+
+    def test_events_are_pruned_once_past(self):
+        """Test that events drop out of matches after their date"""
+        matches = self.index.match(['Driving', 'Heavy Lifting'], today=self.today + timedelta(days=1))
+        self.assertEqual(matches, [])
+        self.assertEqual(len(self.index), 1)
+
+    def test_match_while_events_change(self):
+        """Test that matching and listing are safe while events are edited and pruned"""
+        for i in range(500):
+            self.index.add({'id': i, 'eventName': f'event{i}', 'requiredSkills': ['Driving'],
+                            'eventDate': '2025-06-02'}, today=self.today)
+        stop = threading.Event()
+        errors = []
+        def edit():
+            for i in range(5000):
+                self.index.add({'id': i % 500, 'eventName': f'event{i}', 'requiredSkills': ['Driving', f'skill{i}'],
+                                'eventDate': '2025-06-02'}, today=self.today)
+                self.index.remove((i + 250) % 500)
+                self.index.prune(self.today + timedelta(days=i % 2))
+            stop.set()
+        def read():
+            try:
+                while not stop.is_set():
+                    self.index.match(['driving'], today=self.today)
+                    self.index.events(today=self.today)
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=read) for _ in range(4)] + [threading.Thread(target=edit)]
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(errors, [])
+
+class VolunteerMatchesRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+        user_cache.clear()
+        db['events'] = []
+        rebuild_event_index()
+
+    def tearDown(self):
+        db['events'] = []
+        rebuild_event_index()
+
+    @patch('app.supabase')
+    def test_posted_events_are_matched(self, mock_supabase):
+        """Test that events added through /eventform show up in volunteer matches"""
+        event_data = {
+            'eventName': 'Medical Training',
+            'location': 'Hospital',
+            'requiredSkills': ['First Aid', 'CPR'],
+            'urgency': 'high',
+            'eventDate': (date.today() + timedelta(days=7)).isoformat()
+        }
+        mock_table = MagicMock()
+        mock_supabase.table.return_value = mock_table
+        mock_table.insert.return_value.execute.return_value = MagicMock(data=[])
+        response = self.app.post('/eventform', data=json.dumps(event_data), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+        mock_table.select.return_value.eq.return_value.execute.return_value = MagicMock(
+            data=[{'username': 'medic', 'skills': ['first aid', 'cpr']}]
+        )
+        response = self.app.get('/matches/volunteer/medic')
+        self.assertEqual(response.status_code, 200)
+        matches = json.loads(response.data)['matches']
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(matches[0]['event']['eventName'], 'Medical Training')
+        self.assertEqual(matches[0]['matchScore'], 100.0)
+
+    @patch('app.supabase')
+    def test_catalog_larger_than_one_page_is_indexed(self, mock_supabase):
+        """Test that load_event_catalog indexes events beyond the first 1000 rows"""
+        event_date = (date.today() + timedelta(days=7)).isoformat()
+        events = [{'id': i, 'eventName': f'event{i}', 'requiredSkills': ['Driving'], 'eventDate': event_date}
+                  for i in range(1500)]
+        select = mock_supabase.table.return_value.select.return_value.gte.return_value.order.return_value
+        select.range.side_effect = lambda start, end: MagicMock(
+            execute=MagicMock(return_value=MagicMock(data=events[start:end + 1]))
+        )
+        load_event_catalog()
+        self.assertEqual(len(event_index), 1500)
+        self.assertEqual(len(event_index.match(['driving'])), 1500)
+
+if __name__ == '__main__':
+    unittest.main()
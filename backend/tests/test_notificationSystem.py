@@ -1,7 +1,13 @@
 import unittest
 import json
+import sqlite3
 from datetime import datetime, timedelta
-from app import app, db, create_notification, check_upcoming_events
+from unittest.mock import patch, MagicMock
+from app import (app, db, create_notification, check_upcoming_events, rebuild_volunteer_index,
+                 rebuild_event_index, upsert_event, notification_hub)
+from notifications import (NotificationCompactor, NotificationHub, NotificationStore, NotificationWriteError,
+                           SupabaseNotificationBackend, encode_cursor, new_notification_id, normalize_timestamp)
+from tests.helpers import FakeClock, sqlite_store
 
 class NotificationSystemTestCase(unittest.TestCase):
     def setUp(self):
@@ -12,8 +18,10 @@ class NotificationSystemTestCase(unittest.TestCase):
         # Clear the database
         db['users'] = []
         db['events'] = []
-        db['notifications'] = {}
-        
+        self.store = sqlite_store(hub=notification_hub)
+        self.store_patch = patch('app.notification_store', self.store)
+        self.store_patch.start()
+
         # Create test users
         self.test_user = {
             'username': 'test_user',
@@ -23,6 +31,7 @@ class NotificationSystemTestCase(unittest.TestCase):
             'preferences': 'Weekend events'
         }
         db['users'].append(self.test_user)
+        rebuild_volunteer_index()
 
         # Create test event
         self.test_event = {
@@ -32,13 +41,14 @@ class NotificationSystemTestCase(unittest.TestCase):
             'urgency': 'high',
             'eventDate': (datetime.now() + timedelta(days=1)).isoformat()
         }
-        db['events'].append(self.test_event)
+        upsert_event(self.test_event)
 
     def tearDown(self):
         """Clean up after each test"""
         db['users'].clear()
         db['events'].clear()
-        db['notifications'].clear()
+        rebuild_event_index()
+        self.store_patch.stop()
 
     def test_create_notification(self):
         """Test creating a new notification"""
@@ -49,8 +59,7 @@ class NotificationSystemTestCase(unittest.TestCase):
             'test_id'
         )
         
-        self.assertIn('test_user', db['notifications'])
-        self.assertEqual(len(db['notifications']['test_user']), 1)
+        self.assertEqual(len(self.store.get('test_user')), 1)
         self.assertEqual(notification['message'], 'Test notification message')
         self.assertEqual(notification['type'], 'general')
         self.assertEqual(notification['related_id'], 'test_id')
@@ -69,10 +78,50 @@ class NotificationSystemTestCase(unittest.TestCase):
         self.assertIn('notifications', data)
         self.assertEqual(len(data['notifications']), 2)
         
-        # Verify notification details
+        # Verify notification details, newest first
         notifications = data['notifications']
-        self.assertEqual(notifications[0]['message'], 'Notification 1')
-        self.assertEqual(notifications[1]['message'], 'Notification 2')
+        self.assertEqual(notifications[0]['message'], 'Notification 2')
+        self.assertEqual(notifications[1]['message'], 'Notification 1')
+
+    def test_notification_feed_pages(self):
+        """Test keyset pagination of the notification feed"""
+        ids = [create_notification('test_user', f'Notification {i}', 'general')['id'] for i in range(5)]
+        self.store.mark_read('test_user', ids[3:4])
+
+        first = json.loads(self.app.get('/notifications/test_user?limit=2').data)
+        self.assertEqual([n['id'] for n in first['notifications']], [ids[4], ids[3]])
+        second = json.loads(self.app.get(f"/notifications/test_user?limit=2&before={first['next_cursor']}").data)
+        self.assertEqual([n['id'] for n in second['notifications']], [ids[2], ids[1]])
+        last = json.loads(self.app.get(f"/notifications/test_user?limit=2&before={second['next_cursor']}").data)
+        self.assertEqual([n['id'] for n in last['notifications']], [ids[0]])
+        self.assertIsNone(last['next_cursor'])
+
+        unread = json.loads(self.app.get('/notifications/test_user?limit=3&unread_only=true').data)
+        self.assertEqual([n['id'] for n in unread['notifications']], [ids[4], ids[2], ids[1]])
+
+        newest = create_notification('test_user', 'Notification 5', 'general')
+        new = json.loads(self.app.get(f"/notifications/test_user?after={first['latest_cursor']}").data)
+        self.assertEqual([n['id'] for n in new['notifications']], [newest['id']])
+        unchanged = json.loads(self.app.get(f"/notifications/test_user?after={new['latest_cursor']}").data)
+        self.assertEqual((unchanged['notifications'], unchanged['latest_cursor']), ([], new['latest_cursor']))
+
+    def test_notification_feed_rejects_bad_parameters(self):
+        """Test validation of feed parameters"""
+        crafted = encode_cursor({'timestamp': '2025-01-01T00:00:00+00:00', 'id': '1),username.neq.x'})
+        for query in ('limit=0', 'limit=abc', 'before=not-a-cursor', f'before={crafted}'):
+            response = self.app.get(f'/notifications/test_user?{query}')
+            self.assertEqual(response.status_code, 400)
+
+    def test_supabase_keyset_filter_quotes_the_id(self):
+        """Test that cursor positions are quoted in the PostgREST filter"""
+        client = MagicMock()
+        notification_id = new_notification_id()
+        SupabaseNotificationBackend(client).page('test_user', 10, before=('2025-01-01T00:00:00+00:00', notification_id))
+        query = client.table.return_value.select.return_value.eq.return_value
+        query.or_.assert_called_once_with(
+            'timestamp.lt."2025-01-01T00:00:00+00:00",'
+            f'and(timestamp.eq."2025-01-01T00:00:00+00:00",id.lt."{notification_id}")'
+        )
 
     def test_mark_notifications_read(self):
         """Test marking notifications as read"""
@@ -81,7 +130,7 @@ class NotificationSystemTestCase(unittest.TestCase):
         create_notification('test_user', 'Notification 2', 'event_match', 'id2')
         
         # Get notification IDs
-        notification_ids = [n['id'] for n in db['notifications']['test_user']]
+        notification_ids = [n['id'] for n in self.store.get('test_user')]
         
         # Mark notifications as read
         response = self.app.post(
@@ -93,11 +142,13 @@ class NotificationSystemTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         
         # Verify notifications are marked as read
-        for notification in db['notifications']['test_user']:
+        for notification in self.store.get('test_user'):
             self.assertTrue(notification['read'])
 
-    def test_event_match_notification(self):
+    @patch('app.supabase')
+    def test_event_match_notification(self, mock_supabase):
         """Test notification creation for matching events"""
+        mock_supabase.table.return_value.insert.return_value.execute.return_value = MagicMock(data=[])
         event_data = {
             'eventName': 'First Aid Training',
             'location': 'Medical Center',
@@ -116,13 +167,50 @@ class NotificationSystemTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 201)
         
         # Verify notification was created for matching user
-        self.assertIn('test_user', db['notifications'])
-        notifications = db['notifications']['test_user']
+        notifications = self.store.get('test_user')
         self.assertTrue(any(
             n['type'] == 'event_match' and 'First Aid Training' in n['message']
             for n in notifications
         ))
 
+    def test_mark_all_and_up_to_read(self):
+        """Test marking every notification, or those up to an ID, as read"""
+        ids = [create_notification('test_user', f'Notification {i}', 'general')['id'] for i in range(4)]
+
+        response = self.app.post(
+            '/notifications/test_user/mark-read',
+            data=json.dumps({'up_to': ids[1]}),
+            content_type='application/json'
+        )
+        self.assertEqual(json.loads(response.data)['marked'], 2)
+        self.assertEqual([n['read'] for n in self.store.get('test_user')], [True, True, False, False])
+
+        response = self.app.post(
+            '/notifications/test_user/mark-read',
+            data=json.dumps({'all': True}),
+            content_type='application/json'
+        )
+        self.assertEqual(json.loads(response.data)['marked'], 2)
+        self.assertTrue(all(n['read'] for n in self.store.get('test_user')))
+
+    def test_unread_count(self):
+        """Test the unread badge count as notifications are created and read"""
+        first = create_notification('test_user', 'Notification 1', 'general')
+        create_notification('test_user', 'Notification 2', 'general')
+
+        response = self.app.get('/notifications/test_user/unread-count')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['unread'], 2)
+
+        self.app.post(
+            '/notifications/test_user/mark-read',
+            data=json.dumps({'notification_ids': [first['id']]}),
+            content_type='application/json'
+        )
+        create_notification('test_user', 'Notification 3', 'general')
+        self.assertEqual(json.loads(self.app.get('/notifications/test_user/unread-count').data)['unread'], 2)
+        self.assertEqual(json.loads(self.app.get('/notifications/nobody/unread-count').data)['unread'], 0)
+
     def test_event_reminder_notification(self):
         """Test notification creation for upcoming event reminders"""
         tomorrow_event = {
@@ -132,15 +220,14 @@ class NotificationSystemTestCase(unittest.TestCase):
             'urgency': 'high',
             'eventDate': (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
         }
-        db['events'].append(tomorrow_event)
+        upsert_event(tomorrow_event)
         
         # Manually trigger the reminder check
         from app import check_upcoming_events
         check_upcoming_events(test_mode=True)  # Call with test_mode=True
         
         # Verify reminder notification was created
-        self.assertIn('test_user', db['notifications'])
-        notifications = db['notifications']['test_user']
+        notifications = self.store.get('test_user')
         self.assertTrue(any(
             n['type'] == 'event_reminder' and 'Tomorrow Event' in n['message']
             for n in notifications
@@ -160,7 +247,7 @@ class NotificationSystemTestCase(unittest.TestCase):
         """Test marking non-existent notifications as read"""
         response = self.app.post(
             '/notifications/test_user/mark-read',
-            data=json.dumps({'notification_ids': [999]}),
+            data=json.dumps({'notification_ids': [new_notification_id()]}),
             content_type='application/json'
         )
         
@@ -168,5 +255,389 @@ class NotificationSystemTestCase(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn('error', data)
 
+    def test_mark_read_rejects_invalid_ids(self):
+        """Test that IDs that are not UUIDs are rejected before reaching the database"""
+        for body in ({'notification_ids': [999]}, {'notification_ids': ['not-a-uuid']}, {'up_to': 3}):
+            response = self.app.post(
+                '/notifications/test_user/mark-read', data=json.dumps(body), content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid notification ID', json.loads(response.data)['error'])
+
+class NotificationStreamTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = app.test_client()
+        self.store = sqlite_store(hub=notification_hub)
+        self.store_patch = patch('app.notification_store', self.store)
+        self.store_patch.start()
+        self.keepalive_patch = patch('app.STREAM_KEEPALIVE', 0.01)
+        self.keepalive_patch.start()
+
+    def tearDown(self):
+        self.keepalive_patch.stop()
+        self.store_patch.stop()
+
+    def open_stream(self, **headers):
+        response = self.app.get('/notifications/alice/stream', headers=headers, buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        return response, iter(response.response)
+
+    def next_event(self, chunks):
+        """Return the next notification event, skipping retry and keep-alive lines"""
+        for chunk in chunks:
+            chunk = chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
+            if chunk.startswith('id: '):
+                lines = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+                return lines['id'], json.loads(lines['data'])
+
+    def test_stream_pushes_new_notifications(self):
+        """Test that notifications created after subscribing are pushed"""
+        response, chunks = self.open_stream()
+        next(chunks)
+        self.assertEqual(notification_hub.subscriber_count('alice'), 1)
+        created = create_notification('alice', 'Live', 'general')
+        event_id, data = self.next_event(chunks)
+        self.assertEqual(data['id'], created['id'])
+        self.assertEqual(event_id, encode_cursor(created))
+        response.close()
+        self.assertEqual(notification_hub.subscriber_count('alice'), 0)
+
+    def test_stream_resumes_from_last_event_id(self):
+        """Test that a reconnecting client receives what it missed, once"""
+        seen = create_notification('alice', 'Seen', 'general')
+        missed = [create_notification('alice', f'Missed {i}', 'general') for i in range(2)]
+
+        response, chunks = self.open_stream(**{'Last-Event-ID': encode_cursor(seen)})
+        self.assertEqual([self.next_event(chunks)[1]['id'] for _ in missed], [n['id'] for n in missed])
+        live = create_notification('alice', 'Live', 'general')
+        self.assertEqual(self.next_event(chunks)[1]['id'], live['id'])
+        response.close()
+
+    def test_stream_rejects_bad_last_event_id(self):
+        """Test that an unknown Last-Event-ID is rejected"""
+        response = self.app.get('/notifications/alice/stream', headers={'Last-Event-ID': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+class NotificationHubTestCase(unittest.TestCase):
+    def test_slow_subscriber_is_dropped(self):
+        """Test that publishing never blocks on a full subscriber queue"""
+        hub = NotificationHub(queue_size=2)
+        slow = hub.subscribe('alice')
+        other = hub.subscribe('bob')
+        for i in range(3):
+            hub.publish('alice', {'id': str(i)})
+        self.assertTrue(slow.overflowed)
+        self.assertEqual(hub.subscriber_count(), 1)
+        self.assertEqual([slow.get(0)['id'], slow.get(0)['id']], ['0', '1'])
+        self.assertTrue(slow.closed)
+        self.assertIsNone(other.get(0))
+
+class NotificationStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.connection = sqlite3.connect(':memory:', check_same_thread=False)
+        self.store = sqlite_store(self.connection, batch_size=3)
+
+    def stored_rows(self):
+        return self.connection.execute('select count(*) from notifications').fetchone()[0]
+
+    def test_writes_are_batched(self):
+        """Test that rows are written once a batch fills up"""
+        self.store.create('alice', 'One', 'general')
+        self.store.create('alice', 'Two', 'general')
+        self.assertEqual(self.stored_rows(), 0)
+        self.store.create('bob', 'Three', 'general')
+        self.assertEqual(self.stored_rows(), 3)
+
+    def test_reads_see_pending_notifications(self):
+        """Test that buffered notifications are visible before they are flushed"""
+        self.store.create('alice', 'One', 'general', 'e1')
+        notifications = self.store.get('alice')
+        self.assertEqual([n['message'] for n in notifications], ['One'])
+        self.assertEqual(notifications[0]['related_id'], 'e1')
+
+    def test_notifications_survive_a_new_store(self):
+        """Test that notifications and read flags persist in the table"""
+        first = self.store.create('alice', 'One', 'general')
+        self.store.create('alice', 'Two', 'general')
+        self.assertEqual(self.store.mark_read('alice', [first['id']]), 1)
+        self.store.close()
+
+        reopened = NotificationStore(self.store.backend, flush_interval=None)
+        notifications = reopened.get('alice')
+        self.assertEqual([n['message'] for n in notifications], ['One', 'Two'])
+        self.assertEqual([n['read'] for n in notifications], [True, False])
+
+    def test_flush_on_interval(self):
+        """Test that the background timer flushes partial batches"""
+        store = sqlite_store(self.connection, batch_size=100, flush_interval=0.01)
+        store.create('alice', 'One', 'general')
+        for _ in range(100):
+            if self.stored_rows():
+                break
+            store._stop.wait(0.01)
+        self.assertEqual(self.stored_rows(), 1)
+        store.close()
+
+    def test_fan_out_writes_one_insert_per_chunk(self):
+        """Test that bulk notifications are rendered per user and written in chunks"""
+        self.store.backend = MagicMock(wraps=self.store.backend)
+        usernames = [f'volunteer_{i}' for i in range(7)]
+        created = self.store.create_many(
+            usernames, 'Hi {username}, {event_name} is tomorrow!', 'event_reminder', 'e1',
+            context={'event_name': 'Food {Drive}'}
+        )
+        self.assertEqual(self.store.backend.insert_many.call_count, 3)
+        self.assertEqual(self.stored_rows(), 7)
+        self.assertEqual(created[0]['message'], 'Hi volunteer_0, Food {Drive} is tomorrow!')
+        self.assertEqual(self.store.get('volunteer_6')[0]['related_id'], 'e1')
+
+        stats = self.store.stats()
+        self.assertEqual((stats['batches'], stats['rows_written'], stats['failed_batches']), (3, 7, 0))
+        self.assertIsNotNone(stats['batch_latency_ms']['p95'])
+
+    def test_failed_fan_out_chunk_is_retried(self):
+        """Test that a chunk that fails to insert is queued for the next flush"""
+        self.store.create('alice', 'Cached', 'general')
+        self.store.get('alice')
+        with patch.object(self.store.backend, 'insert_many', side_effect=RuntimeError('unavailable')):
+            self.store.create_many(['alice', 'bob'], 'Hello', 'general')
+        self.assertEqual(self.store.stats()['failed_batches'], 1)
+        self.assertEqual(len(self.store.get('alice')), 2)
+
+        self.assertEqual(self.store.flush(), 2)
+        self.assertEqual(self.stored_rows(), 3)
+
+    def test_failed_fan_out_chunk_is_flushed_on_interval(self):
+        """Test that the background timer retries a failed chunk without another create"""
+        store = sqlite_store(self.connection, flush_interval=0.01)
+        with patch.object(store.backend, 'insert_many', side_effect=RuntimeError('unavailable')):
+            store.create_many(['alice', 'bob'], 'Hello', 'general')
+        for _ in range(100):
+            if self.stored_rows():
+                break
+            store._stop.wait(0.01)
+        self.assertEqual(self.stored_rows(), 2)
+        store.close()
+
+    def reject_username(self, username):
+        """Make the table reject rows for a username, like a failed foreign key"""
+        self.connection.execute(
+            f"create trigger reject_{username} before insert on notifications when new.username = '{username}' "
+            "begin select raise(abort, 'unknown user'); end"
+        )
+
+    def test_rejected_row_does_not_block_other_rows(self):
+        """Test that a row the database rejects is isolated, retried and finally dropped"""
+        self.reject_username('ghost')
+        self.store.create('alice', 'One', 'general')
+        self.store.create('ghost', 'Lost', 'general')
+        self.store.create('alice', 'Two', 'general')
+        self.assertEqual(self.stored_rows(), 2)
+        self.assertEqual([n['message'] for n in self.store.get('alice')], ['One', 'Two'])
+        self.assertEqual(self.store.unread_count('alice'), 2)
+        self.assertEqual(self.store.stats()['pending'], 1)
+
+        for _ in range(self.store.max_attempts):
+            try:
+                self.store.flush(force=True)
+            except NotificationWriteError:
+                continue
+        stats = self.store.stats()
+        self.assertEqual((stats['pending'], stats['dropped']), (0, 1))
+        self.assertEqual(self.store.get('ghost'), [])
+
+    def test_rejected_fan_out_row_does_not_block_its_chunk(self):
+        """Test that a bad row in a bulk chunk is isolated instead of queueing the chunk"""
+        self.reject_username('ghost')
+        self.store.create_many(['alice', 'ghost', 'bob'], 'Hello', 'general')
+        self.assertEqual(self.stored_rows(), 2)
+        self.assertEqual(self.store.stats()['pending'], 1)
+        self.store.create('carol', 'Later', 'general')
+        self.assertEqual(len(self.store.get('carol')), 1)
+        self.assertEqual(self.stored_rows(), 3)
+
+    def test_failed_flush_backs_off_and_reads_carry_on(self):
+        """Test that reads during an outage neither raise nor retry on every call"""
+        self.store.create('alice', 'One', 'general')
+        with patch.object(self.store.backend, 'insert_many', side_effect=RuntimeError('unavailable')) as insert:
+            with self.assertRaises(NotificationWriteError):
+                self.store.flush()
+            self.assertEqual(self.store.flush(), 0)
+            self.assertEqual([n['message'] for n in self.store.get('alice')], ['One'])
+            self.assertEqual(self.store.unread_count('alice'), 1)
+            self.assertEqual(self.store.mark_read('alice', mark_all=True), 1)
+            self.assertEqual(insert.call_count, 1)
+        self.assertEqual(self.store.flush(force=True), 1)
+        reopened = NotificationStore(self.store.backend, flush_interval=None)
+        self.assertEqual([n['read'] for n in reopened.get('alice')], [True])
+
+    def test_cached_reads_expire(self):
+        """Test that rows written by another process show up once the cache expires"""
+        clock = FakeClock()
+        store = sqlite_store(self.connection, cache_ttl=30, clock=clock)
+        other = sqlite_store(self.connection)
+        self.assertEqual(store.get('alice'), [])
+        other.create('alice', 'From another worker', 'general')
+        other.flush()
+        self.assertEqual(store.get('alice'), [])
+        clock.now = 31
+        self.assertEqual([n['message'] for n in store.get('alice')], ['From another worker'])
+
+    def test_unread_counts_expire(self):
+        """Test that an unread badge catches up with other processes after the TTL"""
+        clock = FakeClock()
+        store = sqlite_store(self.connection, cache_ttl=30, clock=clock)
+        other = sqlite_store(self.connection)
+        self.assertEqual(store.unread_count('alice'), 0)
+        other.create('alice', 'One', 'general')
+        other.create('alice', 'Two', 'general')
+        other.flush()
+        self.assertEqual(store.unread_count('alice'), 0)
+        clock.now = 31
+        self.assertEqual(store.unread_count('alice'), 2)
+        other.mark_read('alice', mark_all=True)
+        clock.now = 62
+        self.assertEqual(store.unread_count('alice'), 0)
+
+    def test_pending_read_rows_are_not_counted_unread(self):
+        """Test that rows marked read while their write is pending do not count as unread"""
+        clock = FakeClock()
+        store = sqlite_store(self.connection, cache_ttl=30, clock=clock)
+        store.create('alice', 'One', 'general')
+        store.create('alice', 'Two', 'general')
+        with patch.object(store.backend, 'insert_many', side_effect=RuntimeError('unavailable')):
+            with self.assertRaises(NotificationWriteError):
+                store.flush()
+            self.assertEqual(store.mark_read('alice', mark_all=True), 2)
+            clock.now = 31
+            self.assertEqual(store.unread_count('alice'), 0)
+
+    def test_mark_read_is_one_update(self):
+        """Test that mark-read issues one update and keeps the cache in step"""
+        notifications = [self.store.create('alice', f'Notification {i}', 'general') for i in range(5)]
+        self.store.get('alice')
+        self.store.backend = MagicMock(wraps=self.store.backend)
+
+        changed = self.store.mark_read('alice', [n['id'] for n in notifications[:3]] + ['unknown'])
+        self.assertEqual(changed, 3)
+        self.assertEqual(self.store.backend.mark_read.call_count, 1)
+        self.assertEqual(self.store.unread_count('alice'), 2)
+        self.assertEqual(self.store.mark_read('alice', [notifications[0]['id']]), 0)
+
+        reopened = NotificationStore(self.store.backend, flush_interval=None)
+        self.assertEqual([n['read'] for n in reopened.get('alice')], [True, True, True, False, False])
+
+    def test_unread_count_is_rebuilt_from_the_table(self):
+        """Test that a cold counter is counted in the table and then kept incrementally"""
+        self.store.create('alice', 'One', 'general')
+        self.store.create('alice', 'Two', 'general')
+        self.store.mark_read('alice', mark_all=True)
+        self.store.create('alice', 'Three', 'general')
+        self.store.close()
+
+        reopened = NotificationStore(self.store.backend, flush_interval=None)
+        reopened.backend = MagicMock(wraps=self.store.backend)
+        self.assertEqual(reopened.unread_count('alice'), 1)
+        reopened.create('alice', 'Four', 'general')
+        self.assertEqual(reopened.unread_count('alice'), 2)
+        self.assertEqual(reopened.backend.count_unread.call_count, 1)
+
+    def test_backend_pages_match_cached_pages(self):
+        """Test that keyset queries on the table page like the cache"""
+        created = [self.store.create('alice', f'Notification {i}', 'general') for i in range(7)]
+        self.store.mark_read('alice', [n['id'] for n in created[::3]])
+        cold = NotificationStore(self.store.backend, flush_interval=None)
+        self.store.get('alice')
+        cursor = (created[5]['timestamp'], created[5]['id'])
+        for options in ({}, {'before': cursor}, {'after': (created[1]['timestamp'], created[1]['id'])},
+                        {'unread_only': True}, {'before': cursor, 'unread_only': True}):
+            self.assertEqual(cold.page('alice', 3, **options), self.store.page('alice', 3, **options))
+        self.assertEqual(cold.page('alice', 3, after=cursor), [cold.get('alice')[6]])
+
+    def test_duplicates_within_window_are_dropped(self):
+        """Test deduplication on (username, type, related_id) before anything is written"""
+        self.store.dedupe_window = 60
+        self.store.hub = NotificationHub()
+        subscription = self.store.hub.subscribe('alice')
+        self.assertIsNotNone(self.store.create('alice', 'Reminder', 'event_reminder', 'e1'))
+        self.assertIsNone(self.store.create('alice', 'Reminder', 'event_reminder', 'e1'))
+        self.assertIsNotNone(self.store.create('alice', 'Match', 'event_match', 'e1'))
+        self.assertEqual(len(self.store.create_many(['alice', 'bob'], 'Reminder', 'event_reminder', 'e1')), 1)
+        self.store.create('alice', 'No related id', 'general')
+        self.store.create('alice', 'No related id', 'general')
+
+        self.store.flush()
+        self.assertEqual(self.stored_rows(), 5)
+        self.assertEqual(self.store.stats()['deduplicated'], 2)
+        self.assertEqual([subscription.get(0)['type'] for _ in range(4)],
+                         ['event_reminder', 'event_match', 'general', 'general'])
+
+    def test_duplicates_are_allowed_after_the_window(self):
+        """Test that the dedupe window expires"""
+        clock = FakeClock()
+        store = sqlite_store(self.connection, dedupe_window=60, clock=clock)
+        for now in (0, 30, 100):
+            clock.now = now
+            store.create('alice', 'Reminder', 'event_reminder', 'e1')
+        self.assertEqual(len(store.get('alice')), 2)
+
+    def insert_aged(self, username, ages, read=False):
+        """Insert notifications created the given numbers of days ago"""
+        now = datetime.now()
+        self.store.backend.insert_many([
+            {'id': new_notification_id(), 'username': username, 'message': f'{age} days old', 'type': 'general',
+             'relatedid': None, 'read': read, 'timestamp': normalize_timestamp((now - timedelta(days=age)).astimezone())}
+            for age in ages
+        ])
+
+    def test_compaction_applies_retention_policy(self):
+        """Test expiry by age, earlier expiry of read rows and the per-user cap"""
+        self.insert_aged('alice', [1, 40, 100])
+        self.insert_aged('alice', [10, 40], read=True)
+        self.insert_aged('bob', [1, 2, 3, 4, 5])
+        self.assertEqual(self.store.unread_count('alice'), 3)
+
+        compactor = NotificationCompactor(
+            self.store, max_age=timedelta(days=90), read_max_age=timedelta(days=30), max_per_user=3,
+            batch_size=2, pause=0
+        )
+        self.assertEqual(compactor.run_once(), 4)
+        self.assertEqual([n['message'] for n in self.store.get('alice')], ['40 days old', '10 days old', '1 days old'])
+        self.assertEqual(len(self.store.get('bob')), 3)
+        self.assertEqual(self.store.unread_count('alice'), 2)
+        self.assertEqual(compactor.run_once(), 0)
+        self.assertEqual(compactor.stats()['total_reclaimed'], 4)
+        self.assertEqual(compactor.stats()['runs'], 2)
+
+    def test_compaction_deletes_in_bounded_batches(self):
+        """Test that each delete statement removes at most batch_size rows"""
+        self.insert_aged('alice', range(100, 107))
+        self.store.backend = MagicMock(wraps=self.store.backend)
+        compactor = NotificationCompactor(self.store, max_per_user=None, batch_size=3, pause=0)
+        self.assertEqual(compactor.run_once(), 7)
+        self.assertEqual(self.store.backend.expire.call_count, 3)
+        self.assertEqual(self.stored_rows(), 0)
+
+    def test_cap_is_applied_per_user_over_it(self):
+        """Test that the over-cap users are looked up once and trimmed in batches"""
+        self.insert_aged('alice', range(1, 8))
+        self.insert_aged('bob', [1, 2])
+        self.store.backend = MagicMock(wraps=self.store.backend)
+        compactor = NotificationCompactor(self.store, max_age=None, read_max_age=None, max_per_user=2,
+                                          batch_size=2, pause=0)
+        self.assertEqual(compactor.run_once(), 5)
+        self.assertEqual(self.store.backend.users_over.call_count, 1)
+        self.assertEqual({c.args[0] for c in self.store.backend.trim.call_args_list}, {'alice'})
+        self.assertEqual(self.store.backend.trim.call_count, 3)
+        self.assertEqual([n['message'] for n in self.store.get('alice')], ['2 days old', '1 days old'])
+        self.assertEqual(len(self.store.get('bob')), 2)
+
+    def test_ids_are_time_ordered(self):
+        """Test that notification IDs sort in creation order"""
+        ids = [new_notification_id() for _ in range(1000)]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+
 if __name__ == '__main__':
     unittest.main()
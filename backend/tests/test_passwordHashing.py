@@ -0,0 +1,120 @@
+import unittest
+import threading
+import time
+from unittest.mock import patch, MagicMock
+from passwords import PasswordHasher, PasswordHasherBusy, calibrate, hash_password, hash_rounds, verify_password
+from app import app, user_cache
+
+class PasswordHasherTestCase(unittest.TestCase):
+    def test_hash_and_verify(self):
+        """Test that hashes made on the pool verify on the pool"""
+        hashed = hash_password('password123')
+        self.assertTrue(hashed.startswith('$2'))
+        self.assertTrue(verify_password('password123', hashed))
+        self.assertFalse(verify_password('wrong', hashed))
+
+    def test_saturated_queue_rejects_quickly(self):
+        """Test that calls beyond the workers and queue fail fast"""
+        hasher = PasswordHasher(workers=1, max_queue=1)
+        release = threading.Event()
+        callers = [threading.Thread(target=hasher.submit, args=(release.wait,)) for _ in range(2)]
+        for caller in callers:
+            caller.start()
+        while hasher.stats()['queued'] + hasher.stats()['active'] < 2:
+            time.sleep(0.001)
+
+        started = time.perf_counter()
+        with self.assertRaises(PasswordHasherBusy):
+            hasher.hash_password('password123')
+        self.assertLess(time.perf_counter() - started, 0.1)
+
+        stats = hasher.stats()
+        self.assertEqual((stats['active'], stats['queued'], stats['rejected']), (1, 1, 1))
+        release.set()
+        for caller in callers:
+            caller.join()
+        self.assertEqual(hasher.stats()['completed'], 2)
+        self.assertIsNotNone(hasher.stats()['queue_wait_ms']['p95'])
+
+    def test_outdated_hash_is_rehashed_in_background(self):
+        """Test that a verified password with an old cost is rehashed once"""
+        hasher = PasswordHasher(workers=1, max_queue=1, rounds=5)
+        old = PasswordHasher(workers=1, rounds=4).hash_password('password123')
+        self.assertEqual(hash_rounds(old), 4)
+        self.assertTrue(hasher.needs_rehash(old))
+        self.assertFalse(hasher.needs_rehash(hasher.hash_password('password123')))
+        self.assertFalse(hasher.needs_rehash('not-a-bcrypt-hash'))
+
+        saved = []
+        release = threading.Event()
+        def save(hashed):
+            release.wait()
+            saved.append(hashed)
+        future = hasher.rehash_in_background('password123', old, save)
+        self.assertIsNone(hasher.rehash_in_background('password123', old, save))
+        release.set()
+        future.result()
+
+        self.assertEqual(len(saved), 1)
+        self.assertEqual(hash_rounds(saved[0]), 5)
+        self.assertTrue(hasher.verify_password('password123', saved[0]))
+        self.assertEqual(hasher.stats()['rehashed'], 1)
+
+    def test_calibrate_stays_within_target(self):
+        """Test that calibration picks the highest cost under the target"""
+        rounds, timings = calibrate(1000, max_rounds=6, samples=1)
+        self.assertEqual(rounds, max(cost for cost, elapsed in timings.items() if elapsed <= 1000))
+        self.assertEqual(calibrate(0, max_rounds=6, samples=1)[0], 4)
+
+class PasswordRoutesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+        user_cache.clear()
+
+    @patch('app.supabase')
+    def test_login_verifies_on_the_pool(self, mock_supabase):
+        """Test that login checks the stored bcrypt hash"""
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = MagicMock(
+            data=[{'username': 'testuser', 'password': hash_password('password123')}]
+        )
+        response = self.app.post('/login', json={'username': 'testuser', 'password': 'password123'})
+        self.assertEqual(response.status_code, 200)
+        response = self.app.post('/login', json={'username': 'testuser', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 401)
+
+    @patch('app.rehash_in_background')
+    @patch('app.supabase')
+    def test_login_rehashes_outdated_hash(self, mock_supabase, mock_rehash):
+        """Test that a successful login hands the stored hash to the rehasher"""
+        stored = hash_password('password123')
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = MagicMock(
+            data=[{'username': 'testuser', 'password': stored}]
+        )
+        self.app.post('/login', json={'username': 'testuser', 'password': 'password123'})
+        password, hashed, save = mock_rehash.call_args[0]
+        self.assertEqual((password, hashed), ('password123', stored))
+
+        save('new-hash')
+        mock_supabase.table.return_value.update.assert_called_once_with({'password': 'new-hash'})
+        mock_supabase.table.return_value.update.return_value.eq.assert_called_once_with('username', 'testuser')
+
+    @patch('app.verify_password', side_effect=PasswordHasherBusy)
+    @patch('app.supabase')
+    def test_login_returns_503_when_saturated(self, mock_supabase, mock_verify):
+        """Test that a saturated hashing pool turns logins away with 503"""
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = MagicMock(
+            data=[{'username': 'testuser', 'password': 'hash'}]
+        )
+        response = self.app.post('/login', json={'username': 'testuser', 'password': 'password123'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+    def test_stats_route(self):
+        """Test that pool metrics are exposed"""
+        response = self.app.get('/admin/passwords/stats')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('queued', response.get_json()['passwords'])
+
+if __name__ == '__main__':
+    unittest.main()
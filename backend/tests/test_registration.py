@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import patch
+from postgrest.exceptions import APIError
+from app import app, db, rebuild_volunteer_index, user_cache
+
+class RegistrationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+        user_cache.clear()
+        self.user = {
+            'username': 'newuser',
+            'password': 'password123',
+            'email': 'newuser@example.com',
+            'skills': ['First Aid']
+        }
+
+    def tearDown(self):
+        user_cache.clear()
+        db['users'] = []
+        rebuild_volunteer_index()
+
+    @patch('app.supabase')
+    def test_register_is_a_single_insert(self, mock_supabase):
+        """Test that registration inserts without looking the user up first"""
+        table = mock_supabase.table.return_value
+        response = self.app.post('/register', json=self.user)
+        self.assertEqual(response.status_code, 201)
+        table.insert.assert_called_once()
+        table.select.assert_not_called()
+        self.assertNotIn('password', response.get_json()['user'])
+
+    @patch('app.supabase')
+    def test_duplicate_username_is_rejected(self, mock_supabase):
+        """Test that the unique constraint error maps to 400 User already exists"""
+        mock_supabase.table.return_value.insert.return_value.execute.side_effect = APIError({
+            'code': '23505',
+            'message': 'duplicate key value violates unique constraint "users_username_key"'
+        })
+        response = self.app.post('/register', json=self.user)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'User already exists')
+        self.assertEqual(db['users'], [])
+
+    @patch('app.supabase')
+    def test_other_insert_errors_are_server_errors(self, mock_supabase):
+        """Test that failures other than a duplicate still return 500"""
+        mock_supabase.table.return_value.insert.return_value.execute.side_effect = APIError({
+            'code': '23502',
+            'message': 'null value in column "email" violates not-null constraint'
+        })
+        response = self.app.post('/register', json=self.user)
+        self.assertEqual(response.status_code, 500)
+
+if __name__ == '__main__':
+    unittest.main()
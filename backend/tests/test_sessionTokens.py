@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from tokens import InvalidToken, TokenSigner
+from passwords import hash_password
+from app import app, user_cache
+from tests.helpers import FakeClock
+
+class TokenSignerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(1000000)
+        self.signer = TokenSigner('secret', access_ttl=60, refresh_ttl=600, clock=self.clock)
+
+    def test_issue_and_verify(self):
+        """Test that issued tokens verify and carry the username"""
+        tokens = self.signer.issue('alice')
+        self.assertEqual(self.signer.verify(tokens['access_token'])['sub'], 'alice')
+        self.assertEqual(self.signer.verify(tokens['refresh_token'], token_type='refresh')['sub'], 'alice')
+        self.assertEqual(tokens['expires_in'], 60)
+
+    def test_rejects_forged_expired_and_wrong_type(self):
+        """Test that tampered, expired and mismatched tokens are rejected"""
+        tokens = self.signer.issue('alice')
+        payload, signature = tokens['access_token'].split('.')
+        forged = TokenSigner('other', clock=self.clock).issue('alice')['access_token']
+        for token in (f'{payload}.{signature[:-2]}AA', f'{payload}.{signature[:-1]}\u00e9', f'\u00e9.{signature}',
+                      forged, 'garbage', tokens['refresh_token']):
+            with self.assertRaises(InvalidToken):
+                self.signer.verify(token)
+        self.clock.now += 61
+        with self.assertRaises(InvalidToken):
+            self.signer.verify(tokens['access_token'])
+
+    def test_refresh_rotates_and_revocation(self):
+        """Test that refresh tokens work once and revoked tokens are denied"""
+        tokens = self.signer.issue('alice')
+        renewed = self.signer.refresh(tokens['refresh_token'])
+        self.assertEqual(self.signer.verify(renewed['access_token'])['sub'], 'alice')
+        with self.assertRaises(InvalidToken):
+            self.signer.refresh(tokens['refresh_token'])
+
+        self.signer.revoke(self.signer.verify(renewed['access_token']))
+        with self.assertRaises(InvalidToken):
+            self.signer.verify(renewed['access_token'])
+
+class SessionRoutesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+        user_cache.clear()
+
+    @patch('app.supabase')
+    def login(self, mock_supabase):
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = MagicMock(
+            data=[{'username': 'testuser', 'password': hash_password('password123')}]
+        )
+        response = self.app.post('/login', json={'username': 'testuser', 'password': 'password123'})
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    @patch('app.supabase')
+    def test_session_is_verified_without_supabase(self, mock_supabase):
+        """Test that an access token authenticates requests locally"""
+        tokens = self.login()
+        headers = {'Authorization': f"Bearer {tokens['access_token']}"}
+        response = self.app.get('/session', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['username'], 'testuser')
+        mock_supabase.table.assert_not_called()
+
+        self.assertEqual(self.app.get('/session').status_code, 401)
+        self.assertEqual(self.app.get('/session', headers={'Authorization': 'Bearer nope'}).status_code, 401)
+        headers = {'Authorization': f"Bearer {tokens['access_token'][:-1]}\u00e9"}
+        self.assertEqual(self.app.get('/session', headers=headers).status_code, 401)
+
+    def test_refresh_and_logout(self):
+        """Test token refresh and that logout revokes both tokens"""
+        tokens = self.login()
+        response = self.app.post('/token/refresh', json={'refresh_token': tokens['refresh_token']})
+        self.assertEqual(response.status_code, 200)
+        renewed = response.get_json()
+        self.assertEqual(self.app.post('/token/refresh', json={'refresh_token': tokens['refresh_token']}).status_code, 401)
+
+        headers = {'Authorization': f"Bearer {renewed['access_token']}"}
+        response = self.app.post('/logout', headers=headers, json={'refresh_token': renewed['refresh_token']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.app.get('/session', headers=headers).status_code, 401)
+        self.assertEqual(self.app.post('/token/refresh', json={'refresh_token': renewed['refresh_token']}).status_code, 401)
+
+if __name__ == '__main__':
+    unittest.main()
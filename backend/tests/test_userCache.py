@@ -0,0 +1,136 @@
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+from users import UserCache
+from passwords import hash_password
+from app import app, db, rebuild_volunteer_index, user_cache
+from tests.helpers import FakeClock
+
+class UserCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.rows = {'alice': {'username': 'alice', 'email': 'alice@example.com'}}
+        self.calls = []
+        self.cache = UserCache(self.load, max_entries=2, ttl=60, negative_ttl=5, clock=self.clock)
+
+    def load(self, username):
+        self.calls.append(username)
+        return self.rows.get(username)
+
+    def test_hits_expire_after_ttl(self):
+        """Test that rows are served from the cache until their TTL passes"""
+        self.assertEqual(self.cache.get('alice')['email'], 'alice@example.com')
+        self.cache.get('alice')['email'] = 'mutated'
+        self.assertEqual(self.cache.get('alice')['email'], 'alice@example.com')
+        self.assertEqual(self.calls, ['alice'])
+
+        self.clock.now = 61
+        self.cache.get('alice')
+        self.assertEqual(self.calls, ['alice', 'alice'])
+
+    def test_misses_are_cached_briefly(self):
+        """Test that unknown users are remembered for the negative TTL only"""
+        self.assertIsNone(self.cache.get('bob'))
+        self.assertIsNone(self.cache.get('bob'))
+        self.assertEqual(self.calls, ['bob'])
+        self.clock.now = 6
+        self.rows['bob'] = {'username': 'bob'}
+        self.assertEqual(self.cache.get('bob'), {'username': 'bob'})
+
+    def test_writes_invalidate_and_lru_evicts(self):
+        """Test invalidation, write-through and least-recently-used eviction"""
+        self.cache.get('alice')
+        self.cache.put('alice', {'username': 'alice', 'email': 'new@example.com'})
+        self.assertEqual(self.cache.get('alice')['email'], 'new@example.com')
+        self.cache.invalidate('alice')
+        self.assertEqual(self.cache.get('alice')['email'], 'alice@example.com')
+
+        self.cache.get('bob')
+        self.cache.get('alice')
+        self.cache.get('carol')
+        self.assertEqual(len(self.cache), 2)
+        self.calls.clear()
+        self.cache.get('alice')
+        self.cache.get('bob')
+        self.assertEqual(self.calls, ['bob'])
+
+    def test_concurrent_misses_share_one_load(self):
+        """Test that a burst of lookups for one user makes a single load"""
+        release = threading.Event()
+        def slow_load(username):
+            self.calls.append(username)
+            release.wait()
+            return self.rows.get(username)
+        cache = UserCache(slow_load)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get('alice'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        while cache.stats()['misses'] < 8:
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, ['alice'])
+        self.assertEqual([user['username'] for user in results], ['alice'] * 8)
+
+    def test_invalidate_during_load_discards_result(self):
+        """Test that a row loaded before a write is not cached"""
+        def load(username):
+            self.cache.invalidate(username)
+            return self.load(username)
+        self.cache.load = load
+        self.cache.get('alice')
+        self.cache.load = self.load
+        self.cache.get('alice')
+        self.assertEqual(self.calls, ['alice', 'alice'])
+
+    def test_load_errors_are_not_cached(self):
+        """Test that a failed load raises and the next lookup retries"""
+        self.cache.load = MagicMock(side_effect=[RuntimeError('unavailable'), None])
+        with self.assertRaises(RuntimeError):
+            self.cache.get('alice')
+        self.assertIsNone(self.cache.get('alice'))
+
+class UserCacheRoutesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+        user_cache.clear()
+
+    def tearDown(self):
+        user_cache.clear()
+        db['users'] = []
+        rebuild_volunteer_index()
+
+    @patch('app.supabase')
+    def test_repeated_logins_look_the_user_up_once(self, mock_supabase):
+        """Test that logins after the first are served from the cache"""
+        select = mock_supabase.table.return_value.select
+        select.return_value.eq.return_value.execute.return_value = MagicMock(
+            data=[{'username': 'testuser', 'password': hash_password('password123')}]
+        )
+        for _ in range(3):
+            response = self.app.post('/login', json={'username': 'testuser', 'password': 'password123'})
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(select.call_count, 1)
+
+    @patch('app.supabase')
+    def test_profile_update_refreshes_cache(self, mock_supabase):
+        """Test that a profile write replaces the cached row"""
+        table = mock_supabase.table.return_value
+        table.select.return_value.eq.return_value.execute.return_value = MagicMock(
+            data=[{'username': 'testuser', 'preferences': 'weekends', 'password': 'hash'}]
+        )
+        table.update.return_value.eq.return_value.execute.return_value = MagicMock(
+            data=[{'username': 'testuser', 'preferences': 'evenings', 'password': 'hash'}]
+        )
+        self.app.get('/profile/testuser')
+        self.app.put('/profile/testuser', json={'preferences': 'evenings'})
+        response = self.app.get('/profile/testuser')
+        self.assertEqual(response.get_json()['user']['preferences'], 'evenings')
+        self.assertEqual(table.select.call_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
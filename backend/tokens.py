@@ -0,0 +1,109 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+
+
+class InvalidToken(Exception):
+    """Raised for tokens that are malformed, forged, expired or revoked."""
+
+
+def _encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class TokenSigner:
+    """Issue and verify HMAC-SHA256 signed session tokens.
+
+    A token is ``<payload>.<signature>``, both base64url encoded; the payload
+    holds the username (``sub``), the token type (``access`` or
+    ``refresh``), issue and expiry times and a random ID (``jti``). Tokens
+    are verified with the secret alone, so authenticated requests need
+    neither bcrypt nor a user lookup. Access tokens live ``access_ttl``
+    seconds and refresh tokens ``refresh_ttl`` seconds.
+
+    Revoked token IDs are kept in an in-memory denylist until the token
+    would have expired anyway.
+    """
+
+    def __init__(self, secret, access_ttl=900, refresh_ttl=14 * 24 * 3600, clock=time.time):
+        if isinstance(secret, str):
+            secret = secret.encode('utf-8')
+        self.secret = secret
+        self.access_ttl = access_ttl
+        self.refresh_ttl = refresh_ttl
+        self.clock = clock
+        self._denylist = {}
+        self._lock = threading.Lock()
+
+    def _sign(self, payload):
+        return _encode(hmac.new(self.secret, payload.encode('ascii'), hashlib.sha256).digest())
+
+    def _token(self, username, token_type, ttl):
+        now = int(self.clock())
+        claims = {'sub': username, 'typ': token_type, 'iat': now, 'exp': now + ttl, 'jti': secrets.token_hex(16)}
+        payload = _encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+        return f'{payload}.{self._sign(payload)}'
+
+    def issue(self, username):
+        """Return a new access/refresh token pair for ``username``."""
+        return {
+            'access_token': self._token(username, 'access', self.access_ttl),
+            'refresh_token': self._token(username, 'refresh', self.refresh_ttl),
+            'token_type': 'Bearer',
+            'expires_in': self.access_ttl
+        }
+
+    def verify(self, token, token_type='access'):
+        """Return the claims of a valid token; raises InvalidToken otherwise."""
+        try:
+            payload, signature = token.split('.')
+            # Compared as bytes: compare_digest rejects non-ASCII strings with TypeError
+            if not hmac.compare_digest(signature.encode('utf-8'), self._sign(payload).encode('ascii')):
+                raise InvalidToken('Invalid token signature')
+            claims = json.loads(_decode(payload))
+        except (AttributeError, ValueError, UnicodeError):
+            raise InvalidToken('Malformed token')
+        if claims.get('typ') != token_type:
+            raise InvalidToken(f'Expected a {token_type} token')
+        if claims.get('exp', 0) <= self.clock():
+            raise InvalidToken('Token has expired')
+        with self._lock:
+            if claims.get('jti') in self._denylist:
+                raise InvalidToken('Token has been revoked')
+        return claims
+
+    def revoke(self, claims):
+        """Deny a verified token until it expires; returns False if it was already denied."""
+        now = self.clock()
+        with self._lock:
+            if claims['jti'] in self._denylist:
+                return False
+            self._denylist[claims['jti']] = claims['exp']
+            for jti in [jti for jti, expires in self._denylist.items() if expires <= now]:
+                del self._denylist[jti]
+            return True
+
+    def refresh(self, refresh_token):
+        """Exchange a refresh token for a new pair; each refresh token works once."""
+        claims = self.verify(refresh_token, token_type='refresh')
+        if not self.revoke(claims):
+            raise InvalidToken('Token has been revoked')
+        return self.issue(claims['sub'])
+
+
+def default_secret():
+    """SESSION_SECRET from the environment, or a per-process random secret."""
+    secret = os.getenv('SESSION_SECRET')
+    if not secret:
+        print("SESSION_SECRET is not set; session tokens will not survive a restart.", file=sys.stderr)
+        secret = secrets.token_hex(32)
+    return secret
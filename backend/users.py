@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Load:
+    """A lookup in progress; concurrent callers for the same user wait on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.user = None
+        self.error = None
+
+
+class UserCache:
+    """Process-local LRU cache of user rows keyed by username.
+
+    ``load(username)`` fetches a user row, or None when there is no such
+    user. Rows are kept for ``ttl`` seconds and misses for ``negative_ttl``
+    seconds, at most ``max_entries`` in total. Concurrent lookups of a user
+    that is not cached share a single ``load`` call. Writers call
+    ``invalidate`` (or ``put`` with the row they wrote); other processes see
+    the change once their entry expires.
+    """
+
+    def __init__(self, load, max_entries=10000, ttl=60.0, negative_ttl=5.0, clock=time.monotonic):
+        self.load = load
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _store(self, username, user):
+        ttl = self.ttl if user is not None else self.negative_ttl
+        if ttl <= 0:
+            self._entries.pop(username, None)
+            return
+        self._entries[username] = (self.clock() + ttl, user)
+        self._entries.move_to_end(username)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, username):
+        """Return the user row for ``username``, or None if there is no such user."""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(username)
+                self.hits += 1
+                return dict(entry[1]) if entry[1] is not None else None
+            self.misses += 1
+            pending = self._loading.get(username)
+            if pending is None:
+                pending = self._loading[username] = _Load()
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return dict(pending.user) if pending.user is not None else None
+
+        try:
+            pending.user = self.load(username)
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                self.loads += 1
+                # An invalidate during the load retires it; its result may predate the write
+                if self._loading.get(username) is pending:
+                    del self._loading[username]
+                    if pending.error is None:
+                        self._store(username, pending.user)
+            pending.done.set()
+        return dict(pending.user) if pending.user is not None else None
+
+    def put(self, username, user):
+        """Cache a row just written for ``username``."""
+        with self._lock:
+            self._loading.pop(username, None)
+            self._store(username, dict(user))
+
+    def invalidate(self, username):
+        """Forget ``username`` after a write."""
+        with self._lock:
+            self._loading.pop(username, None)
+            self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._loading.clear()
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'loads': self.loads,
+                'hit_rate': self.hits / lookups if lookups else None
+            }
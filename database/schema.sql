@@ -41,16 +41,132 @@ create table if not exists public.volunteerHistory (
         dateVolunteered date not null,
         createdAt timestamp with time zone default timezone('utc'::text, now()) not null
 );
+-- Event reminders already sent, so the reminder scheduler neither repeats
+-- nor drops them across restarts
+create table if not exists public.sentReminders (
+    eventId text not null,
+    eventDate text not null,
+    sentAt timestamp with time zone default timezone('utc'::text, now()) not null,
+    primary key (eventId, eventDate)
+);
 -- Create indexes for better query performance
 create index if not exists idx_users_username on public.users(username);
 create index if not exists idx_events_eventName on public.events(eventName);
-create index if not exists idx_notifications_username on public.notifications(username);
+create index if not exists idx_events_eventDate on public.events(eventDate);
+-- Newest-first keyset pages of a user's feed
+create index if not exists idx_notifications_username_timestamp on public.notifications(username, timestamp desc, id desc);
+-- Unread counts only touch unread rows
+create index if not exists idx_notifications_unread on public.notifications(username)
+where not read;
+-- Retention sweeps delete by age across all users
+create index if not exists idx_notifications_timestamp on public.notifications(timestamp);
 create index if not exists idx_volunteer_history_username on public.volunteerHistory(username);
+-- Canonical form of a skill list: trimmed, inner whitespace collapsed,
+-- lowercased, without blanks or duplicates (mirrors canonical_skills in matching.py)
+create or replace function public.canonical_skills(skills text []) returns text [] language sql immutable parallel safe as $$
+select coalesce(
+        array_agg(distinct canonical) filter (
+            where canonical <> ''
+        ),
+        '{}'
+    )
+from (
+        select lower(btrim(regexp_replace(skill, '\s+', ' ', 'g'))) as canonical
+        from unnest(skills) as skill
+    ) as normalized $$;
+-- GIN index so skill overlap (&&) only visits volunteers sharing a skill
+create index if not exists idx_users_skills_canonical on public.users using gin (public.canonical_skills(skills));
+-- Top-k volunteers for a set of required skills, scored like calculate_match_score:
+-- (overlapping skills / required skills) * 100, kept when above the threshold,
+-- highest score first and ties broken by username
+create or replace function public.match_volunteers(
+        required_skills text [],
+        match_threshold double precision default 50,
+        max_matches integer default 5
+    ) returns table (
+        username text,
+        email text,
+        score double precision
+    ) language sql stable as $$ with required as (
+        select public.canonical_skills(required_skills) as skills
+    ),
+    scored as (
+        select u.username,
+            u.email,
+            (
+                cardinality(
+                    array(
+                        select unnest(public.canonical_skills(u.skills))
+                        intersect
+                        select unnest(r.skills)
+                    )
+                )::double precision / cardinality(r.skills)
+            ) * 100 as score
+        from public.users u,
+            required r
+        where cardinality(r.skills) > 0
+            and public.canonical_skills(u.skills) && r.skills
+    )
+select scored.username,
+    scored.email,
+    scored.score
+from scored
+where scored.score > match_threshold
+order by scored.score desc,
+    scored.username collate "C"
+limit max_matches $$;
+-- Delete up to batch_size notifications older than cutoff, or read and
+-- older than read_cutoff (a null cutoff is not applied). The later of the
+-- two cutoffs bounds a range scan of idx_notifications_timestamp.
+-- Returns the usernames of the deleted rows.
+create or replace function public.expire_notifications(
+        cutoff timestamp with time zone,
+        read_cutoff timestamp with time zone,
+        batch_size integer
+    ) returns table (username text) language sql volatile as $$
+delete from public.notifications n
+where n.id in (
+        select e.id
+        from public.notifications e
+        where e.timestamp < greatest(cutoff, read_cutoff)
+            and (
+                coalesce(e.timestamp < cutoff, false)
+                or coalesce(e.read and e.timestamp < read_cutoff, false)
+            )
+        limit batch_size
+    )
+returning n.username $$;
+-- Users with more than max_per_user notifications, looked up once per
+-- compaction run.
+create or replace function public.notification_users_over(max_per_user integer) returns table (username text) language sql stable as $$
+select n.username
+from public.notifications n
+group by n.username
+having count(*) > max_per_user $$;
+-- Delete up to batch_size of a user's notifications beyond their newest
+-- max_per_user, walking idx_notifications_username_timestamp.
+-- Returns the usernames of the deleted rows.
+create or replace function public.trim_notifications(
+        target_username text,
+        max_per_user integer,
+        batch_size integer
+    ) returns table (username text) language sql volatile as $$
+delete from public.notifications n
+where n.id in (
+        select t.id
+        from public.notifications t
+        where t.username = target_username
+        order by t.timestamp desc,
+            t.id desc
+        limit batch_size offset max_per_user
+    )
+returning n.username $$;
 -- Enable Row Level Security (RLS) for each table
 alter table public.users enable row level security;
 alter table public.events enable row level security;
 alter table public.notifications enable row level security;
 alter table public.volunteerHistory enable row level security;
+alter table public.sentReminders enable row level security;
 -- Define policies
 -- Users policies
 create policy "Users can view their own profile" on public.users for